@@ -1,53 +1,254 @@
-import requests
+import argparse
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 
-def get_weather_forecast():
+from agenda_rules import (DEFAULT_RULES, ForecastTable, build_agenda, iter_forecast_records,
+                          load_rules, stream_agenda)
+from http_cache import ResponseCache
+
+# requests is imported by the functions that talk to the API, so --help and
+# offline runs start quickly.
+
+FORECAST_URL = "http://api.openweathermap.org/data/2.5/forecast"
+DEFAULT_LOCATION = "Rebstein,CH"
+
+def fetch_forecast(location=DEFAULT_LOCATION, units="metric", api_key=None, cache=None,
+                   session=None, base_url=FORECAST_URL, timeout=10):
+    """
+    Fetches the raw forecast payload for a location, raising on HTTP errors.
+
+    With a cache, fresh entries are returned without a request and expired
+    entries are revalidated with If-None-Match / If-Modified-Since.
+    """
+    if api_key is None:
+        api_key = os.environ.get("OPENWEATHER_API_KEY", "your_api_key_here")  # Replace with your actual API key
+
+    key = ResponseCache.make_key(base_url, location, units)
+    entry = cache.get(key) if cache else None
+    if entry and cache.is_fresh(entry):
+        return json.loads(entry.body)
+
+    import requests
+
+    headers = cache.conditional_headers(entry) if entry else {}
+    params = {"q": location, "appid": api_key, "units": units}
+    response = (session or requests).get(base_url, params=params, headers=headers, timeout=timeout)
+
+    if response.status_code == 304 and entry:
+        cache.touch(key)
+        return json.loads(entry.body)
+
+    response.raise_for_status()
+
+    # Only cache bodies that parse as a forecast, so a truncated or HTML error
+    # body is not served from the cache until it expires
+    payload = response.json()
+    if not isinstance(payload, dict) or not isinstance(payload.get("list"), list):
+        raise ValueError(f"unexpected forecast payload for {location}")
+    if cache:
+        cache.put(key, response.content, response.headers.get("ETag"),
+                  response.headers.get("Last-Modified"))
+    return payload
+
+def get_weather_forecast(location=DEFAULT_LOCATION, units="metric", cache=None, base_url=FORECAST_URL):
     """
     Fetches the weather forecast for Rebstein for the rest of the week.
+
+    Responses are cached on disk; pass cache=False to always fetch.
     """
-    api_key = "your_api_key_here"  # Replace with your actual API key
-    location = "Rebstein,CH"
-    url = f"http://api.openweathermap.org/data/2.5/forecast?q={location}&appid={api_key}&units=metric"
+    import requests
 
-    response = requests.get(url)
-    if response.status_code == 200:
-        return response.json()
-    else:
+    if cache is None:
+        try:
+            cache = ResponseCache()
+        except OSError:
+            cache = False
+
+    try:
+        return fetch_forecast(location, units, cache=cache or None, base_url=base_url)
+    except (requests.RequestException, ValueError):
         print("Error fetching weather data.")
         return None
+    except OSError:
+        # The cache directory is read-only or full, fetch without it
+        return get_weather_forecast(location, units, cache=False, base_url=base_url)
+
+def stream_weather_forecast(location=DEFAULT_LOCATION, units="metric", api_key=None,
+                            base_url=FORECAST_URL, timeout=10):
+    """
+    Streams a forecast from the API, yielding the record of each slot as it is parsed.
 
-def generate_agenda(weather_data):
+    The response body is never held in memory as a whole and is not cached.
+    """
+    if api_key is None:
+        api_key = os.environ.get("OPENWEATHER_API_KEY", "your_api_key_here")  # Replace with your actual API key
+
+    import requests
+
+    params = {"q": location, "appid": api_key, "units": units}
+    with requests.get(base_url, params=params, timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+        yield from iter_forecast_records(response.iter_content(chunk_size=64 * 1024), location)
+
+BatchResult = namedtuple("BatchResult", ["forecasts", "errors"])
+
+def error_message(error):
+    """
+    Describes a failed fetch without the API key that requests includes in URLs.
+    """
+    return re.sub(r"(appid=)[^&\s'\")]*", r"\1<redacted>", str(error))
+
+class RateLimiter:
+    """
+    Token bucket limiting how many requests per second the worker threads start.
+    """
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+def create_session(pool_size=16):
+    """
+    Creates a session whose keep-alive connection pool is shared by all workers.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def fetch_with_retry(location, retries=3, backoff=0.5, rate_limiter=None, **kwargs):
+    """
+    Fetches one forecast, retrying connection errors, timeouts, 429 and 5xx
+    responses with exponential backoff and jitter.
+    """
+    import requests
+
+    for attempt in range(retries + 1):
+        if rate_limiter:
+            rate_limiter.acquire()
+        try:
+            return fetch_forecast(location, **kwargs)
+        except requests.RequestException as e:
+            status = e.response.status_code if e.response is not None else None
+            retryable = status is None or status == 429 or status >= 500
+            if not retryable or attempt == retries:
+                raise
+        time.sleep(backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+
+def get_weather_forecasts(locations, units="metric", max_workers=8, timeout=10, retries=3,
+                          backoff=0.5, rate_limit=None, cache=None, base_url=FORECAST_URL,
+                          api_key=None):
+    """
+    Fetches forecasts for many locations concurrently over pooled connections.
+
+    Returns a BatchResult with the forecasts of the locations that succeeded
+    and an error message for each location that failed.
+    """
+    import requests
+
+    rate_limiter = RateLimiter(rate_limit) if rate_limit else None
+    forecasts = {}
+    errors = {}
+
+    with create_session(max_workers) as session, ThreadPoolExecutor(max_workers) as pool:
+        futures = {
+            location: pool.submit(fetch_with_retry, location, retries, backoff, rate_limiter,
+                                  units=units, api_key=api_key, cache=cache, session=session,
+                                  base_url=base_url, timeout=timeout)
+            for location in dict.fromkeys(locations)
+        }
+        for location, future in futures.items():
+            try:
+                forecasts[location] = future.result()
+            except (requests.RequestException, ValueError, OSError) as e:
+                # OSError comes from the shared cache directory, it only fails this location
+                errors[location] = error_message(e)
+
+    return BatchResult(forecasts, errors)
+
+def generate_agenda(weather_data, rules=DEFAULT_RULES):
     """
     Generates an agenda of things to do in Rebstein for the rest of the week based on the weather forecast.
+
+    weather_data is either a forecast payload or an iterable of slot records,
+    such as the generators returned by stream_weather_forecast and iter_forecast_records.
     """
-    agenda = []
     if not weather_data:
-        return agenda
+        return []
+    if not isinstance(weather_data, dict):
+        return list(stream_agenda(weather_data, rules))
+    return list(generate_agendas({DEFAULT_LOCATION: weather_data}, rules))
 
-    for forecast in weather_data['list']:
-        date = forecast['dt_txt']
-        weather = forecast['weather'][0]['description']
-        temp = forecast['main']['temp']
+def generate_agendas(forecasts, rules=DEFAULT_RULES):
+    """
+    Generates the agenda for a {location: payload} batch of forecasts.
 
-        if "rain" in weather or "snow" in weather:
-            activity = "Visit a museum or enjoy indoor activities"
-        elif temp > 25:
-            activity = "Go swimming or have a picnic in the park"
-        else:
-            activity = "Take a hike or explore the town"
+    All slots are classified in one vectorized pass; the returned agenda
+    formats lines only when they are accessed. Use Agenda.for_location to
+    get the lines of a single location.
+    """
+    return build_agenda(ForecastTable.from_payloads(forecasts), rules)
 
-        agenda.append(f"{date}: {activity} (Weather: {weather}, Temp: {temp}°C)")
+def main():
+    parser = argparse.ArgumentParser(description="Suggest activities based on the weather forecast.")
+    parser.add_argument("locations", nargs="*", default=[DEFAULT_LOCATION],
+                        help=f"locations such as 'Zurich,CH' (default: {DEFAULT_LOCATION})")
+    parser.add_argument("--workers", type=int, default=8, help="concurrent requests")
+    parser.add_argument("--rate-limit", type=float, help="maximum requests per second")
+    parser.add_argument("--no-cache", action="store_true", help="always fetch fresh forecasts")
+    parser.add_argument("--rules", help="JSON file with the activity rule table")
+    parser.add_argument("--file", help="read the forecast from a local JSON file instead of the API")
+    args = parser.parse_args()
 
-    return agenda
+    rules = load_rules(args.rules) if args.rules else DEFAULT_RULES
 
-def main():
-    weather_data = get_weather_forecast()
-    agenda = generate_agenda(weather_data)
-    if agenda:
-        print("Agenda for the rest of the week in Rebstein:")
-        for item in agenda:
+    if args.file:
+        # Offline run: stream the file so large forecast files use constant memory
+        location = args.locations[0]
+        print(f"Agenda for {location} from {args.file}:")
+        for item in stream_agenda(iter_forecast_records(args.file, location), rules):
             print(item)
-    else:
-        print("Could not generate agenda due to lack of weather data.")
+        return
+
+    cache = None if args.no_cache else ResponseCache()
+    result = get_weather_forecasts(args.locations, max_workers=args.workers,
+                                   rate_limit=args.rate_limit, cache=cache)
+    agendas = generate_agendas(result.forecasts, rules)
+
+    for location in args.locations:
+        if location in result.errors:
+            print(f"Error fetching weather data for {location}: {result.errors[location]}")
+        agenda = agendas.for_location(location)
+        if agenda:
+            print(f"Agenda for the rest of the week in {location}:")
+            for item in agenda:
+                print(item)
+        else:
+            print(f"Could not generate agenda for {location} due to lack of weather data.")
 
 if __name__ == "__main__":
     main()
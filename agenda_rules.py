@@ -0,0 +1,246 @@
+"""
+Columnar, rule-table driven activity suggestions.
+
+Forecast slots are stored as NumPy columns (location, timestamp, date,
+temperature, condition id, description) and activities are chosen by a
+declarative rule table evaluated over all rows at once. Rules are checked
+in order and the first matching rule wins; a rule matches when all of its
+conditions hold, so a rule without conditions acts as the default.
+
+Supported conditions:
+
+    description_contains   list of substrings, any of which must appear
+    condition_ids          list of OpenWeatherMap weather condition ids
+    temp_above             temperature strictly above this value
+    temp_below             temperature strictly below this value
+
+Rule tables can be stored as JSON files (a list of rule objects) so the
+rules can be changed without editing code.
+"""
+
+import json
+from array import array
+from collections.abc import Sequence
+from datetime import datetime, timezone
+from itertools import islice
+
+import numpy as np
+
+from json_stream import iter_array_items, iter_text
+
+DEFAULT_RULES = [
+    {"activity": "Visit a museum or enjoy indoor activities", "description_contains": ["rain", "snow"]},
+    {"activity": "Go swimming or have a picnic in the park", "temp_above": 25},
+    {"activity": "Take a hike or explore the town"},
+]
+
+CONDITIONS = {"description_contains", "condition_ids", "temp_above", "temp_below"}
+
+# Condition values: description_contains and condition_ids are lists, temperatures are numbers
+LIST_CONDITIONS = {"description_contains": str, "condition_ids": int}
+NUMBER_CONDITIONS = {"temp_above", "temp_below"}
+
+def load_rules(path):
+    """
+    Loads a rule table from a JSON file.
+    """
+    with open(path, encoding="utf-8") as f:
+        rules = json.load(f)
+    if not isinstance(rules, list) or not rules:
+        raise ValueError(f"{path}: the rule table must be a non-empty list of rules")
+    for rule in rules:
+        if "activity" not in rule:
+            raise ValueError(f"rule without activity: {rule}")
+        unknown = set(rule) - CONDITIONS - {"activity"}
+        if unknown:
+            raise ValueError(f"unknown rule conditions: {', '.join(sorted(unknown))}")
+        for name, item_type in LIST_CONDITIONS.items():
+            value = rule.get(name, [])
+            if not isinstance(value, list) or not all(
+                    isinstance(item, item_type) and not isinstance(item, bool) for item in value):
+                raise ValueError(f"{name} must be a list of {item_type.__name__} values: {rule}")
+        for name in NUMBER_CONDITIONS & set(rule):
+            if not isinstance(rule[name], (int, float)) or isinstance(rule[name], bool):
+                raise ValueError(f"{name} must be a number: {rule}")
+    return rules
+
+class ForecastTable:
+    """
+    Forecast slots of one or more locations stored column by column.
+    """
+    def __init__(self, locations, location, timestamp, dates, temp, whole, condition, descriptions,
+                 description):
+        self.locations = locations          # location names, indexed by the location column
+        self.location = location            # int32 location index per slot
+        self.timestamp = timestamp          # int64 unix time (UTC) per slot
+        self.dates = dates                  # date text (dt_txt) per slot, as shown in the agenda
+        self.temp = temp                    # float64 temperature per slot
+        self.whole = whole                  # bool per slot, the temperature was given as an integer
+        self.condition = condition          # int32 weather condition id per slot
+        self.descriptions = descriptions    # distinct descriptions, indexed by the description column
+        self.description = description      # int32 description index per slot
+
+    def __len__(self):
+        return len(self.timestamp)
+
+    @classmethod
+    def from_records(cls, records):
+        """
+        Builds a table from (location, timestamp, date, temp, condition id, description) tuples.
+        """
+        # Typed arrays keep the columns compact while records are consumed
+        locations = {}
+        descriptions = {}
+        dates = []
+        location, timestamp, temp, whole = array("i"), array("q"), array("d"), array("b")
+        condition, description = array("i"), array("i")
+        for loc, ts, date, t, cond, desc in records:
+            location.append(locations.setdefault(loc, len(locations)))
+            timestamp.append(ts)
+            dates.append(date)
+            temp.append(t)
+            whole.append(isinstance(t, int))
+            condition.append(cond)
+            description.append(descriptions.setdefault(desc, len(descriptions)))
+        return cls(
+            list(locations),
+            np.frombuffer(location, dtype=np.int32),
+            np.frombuffer(timestamp, dtype=np.int64),
+            dates,
+            np.frombuffer(temp, dtype=np.float64),
+            np.frombuffer(whole, dtype=np.bool_),
+            np.frombuffer(condition, dtype=np.int32),
+            list(descriptions),
+            np.frombuffer(description, dtype=np.int32),
+        )
+
+    @classmethod
+    def from_payloads(cls, payloads):
+        """
+        Builds a table from forecast payloads, given as a {location: payload} dict.
+        """
+        return cls.from_records(
+            record
+            for location, payload in payloads.items() if payload
+            for record in payload_records(location, payload)
+        )
+
+def slot_timestamp(forecast):
+    """
+    Returns the unix time of a forecast slot, parsing dt_txt if dt is missing.
+    """
+    if "dt" in forecast:
+        return forecast["dt"]
+    parsed = datetime.strptime(forecast["dt_txt"], "%Y-%m-%d %H:%M:%S")
+    return int(parsed.replace(tzinfo=timezone.utc).timestamp())
+
+def forecast_record(location, forecast):
+    """
+    Returns the table record of one forecast slot.
+    """
+    weather = forecast["weather"][0]
+    timestamp = slot_timestamp(forecast)
+    date = forecast.get("dt_txt")
+    if date is None:
+        date = datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    return (location, timestamp, date, forecast["main"]["temp"],
+            weather.get("id", 0), weather["description"])
+
+def payload_records(location, payload):
+    """
+    Yields the table record of every slot in a forecast payload.
+    """
+    for forecast in payload["list"]:
+        yield forecast_record(location, forecast)
+
+def iter_forecast_records(source, location):
+    """
+    Parses a forecast payload incrementally and yields the record of every slot.
+
+    source is a JSON file path, a file object or an iterable of byte chunks
+    such as response.iter_content(). Only one slot is held in memory at a time.
+    """
+    for forecast in iter_array_items(iter_text(source), "list"):
+        yield forecast_record(location, forecast)
+
+def classify(table, rules=DEFAULT_RULES):
+    """
+    Returns the index of the first matching rule for every slot, or -1 if none matches.
+    """
+    matches = []
+    for rule in rules:
+        match = np.ones(len(table), dtype=bool)
+        if "description_contains" in rule:
+            # Evaluate substrings once per distinct description, then look up per slot
+            words = rule["description_contains"]
+            per_description = np.array([any(word in d for word in words) for d in table.descriptions], dtype=bool)
+            if len(per_description):
+                match &= per_description[table.description]
+        if "condition_ids" in rule:
+            match &= np.isin(table.condition, rule["condition_ids"])
+        if "temp_above" in rule:
+            match &= table.temp > rule["temp_above"]
+        if "temp_below" in rule:
+            match &= table.temp < rule["temp_below"]
+        matches.append(match)
+    return np.select(matches, np.arange(len(rules)), default=-1)
+
+class Agenda(Sequence):
+    """
+    Agenda lines for a selection of forecast slots, formatted only when accessed.
+    """
+    def __init__(self, table, rule_index, rules, rows=None):
+        self.table = table
+        self.rule_index = rule_index
+        self.rules = rules
+        self.rows = np.arange(len(table)) if rows is None else rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.format(row) for row in self.rows[index]]
+        return self.format(self.rows[index])
+
+    def format(self, row):
+        """
+        Formats the agenda line of one table row.
+        """
+        table = self.table
+        date = table.dates[row]
+        rule = self.rule_index[row]
+        activity = self.rules[rule]["activity"] if rule >= 0 else "No suggestion"
+        weather = table.descriptions[table.description[row]]
+        # Show the temperature as the forecast gave it, 20 rather than 20.0
+        temp = float(table.temp[row])
+        if table.whole[row]:
+            temp = int(temp)
+        return f"{date}: {activity} (Weather: {weather}, Temp: {temp}°C)"
+
+    def for_location(self, location):
+        """
+        Returns the part of the agenda for one location.
+        """
+        if location not in self.table.locations:
+            return Agenda(self.table, self.rule_index, self.rules, self.rows[:0])
+        code = self.table.locations.index(location)
+        return Agenda(self.table, self.rule_index, self.rules,
+                      self.rows[self.table.location[self.rows] == code])
+
+def build_agenda(table, rules=DEFAULT_RULES):
+    """
+    Classifies every slot of a table and returns the lazily formatted agenda.
+    """
+    return Agenda(table, classify(table, rules), rules)
+
+def stream_agenda(records, rules=DEFAULT_RULES, chunk_size=65536):
+    """
+    Yields agenda lines for a stream of records, classifying chunk_size rows at a time.
+    """
+    records = iter(records)
+    while True:
+        table = ForecastTable.from_records(islice(records, chunk_size))
+        if not len(table):
+            return
+        yield from build_agenda(table, rules)
@@ -0,0 +1,113 @@
+"""Benchmark batch forecast fetching against a local stand-in server.
+
+The server answers every request after a simulated network latency and
+fails a fraction of requests with 503 to exercise retries. The benchmark
+compares the old approach (one request at a time, a fresh connection per
+call) with agenda.get_weather_forecasts.
+
+    python benchmarks/agenda_batch.py --locations 200 --latency 0.05
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import agenda
+
+
+def make_payload(location):
+    """A small forecast in the shape returned by OpenWeatherMap"""
+    start = 1792368000  # 2026-10-19 00:00 UTC
+    return {
+        'city': {'name': location},
+        'list': [
+            {
+                'dt': start + i * 10800,
+                'dt_txt': datetime.fromtimestamp(start + i * 10800, timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
+                'weather': [{'id': 500, 'description': 'light rain' if i % 3 == 0 else 'clear sky'}],
+                'main': {'temp': 10.0 + i % 20},
+            }
+            for i in range(40)
+        ]
+    }
+
+
+def start_server(latency, failure_rate):
+    """Start a stand-in forecast server in a background thread"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            time.sleep(latency)
+            if random.random() < failure_rate:
+                self.send_response(503)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            location = parse_qs(urlparse(self.path).query).get('q', [''])[0]
+            body = json.dumps(make_payload(location)).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}/forecast'
+
+
+def run_sequential(locations, base_url):
+    """One request at a time with a fresh connection per call"""
+    forecasts = {}
+    for location in locations:
+        try:
+            forecasts[location] = agenda.fetch_forecast(location, base_url=base_url)
+        except Exception:
+            pass
+    return forecasts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent forecast fetching.")
+    parser.add_argument('--locations', type=int, default=200, help="number of locations")
+    parser.add_argument('--latency', type=float, default=0.05, help="simulated latency in seconds")
+    parser.add_argument('--failure-rate', type=float, default=0.05, help="fraction of requests failing with 503")
+    parser.add_argument('--workers', type=int, default=16, help="concurrent requests")
+    args = parser.parse_args()
+
+    server, base_url = start_server(args.latency, args.failure_rate)
+    locations = [f'City{i},CH' for i in range(args.locations)]
+
+    start = time.perf_counter()
+    forecasts = run_sequential(locations, base_url)
+    sequential = time.perf_counter() - start
+    print(f"sequential: {sequential:.2f} s, {len(forecasts)}/{len(locations)} forecasts")
+
+    start = time.perf_counter()
+    result = agenda.get_weather_forecasts(locations, max_workers=args.workers,
+                                          backoff=0.05, base_url=base_url)
+    batch = time.perf_counter() - start
+    print(f"batch:      {batch:.2f} s, {len(result.forecasts)}/{len(locations)} forecasts, "
+          f"{len(result.errors)} failed")
+    print(f"speedup:    {sequential / batch:.1f}x")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Guard the import time of the computational parts of the scripts.
+
+Each check imports one name in a fresh interpreter with ``python -X importtime``
+and fails if the import exceeds its time budget or pulls in one of the heavy
+presentation libraries, which must only load once a rendering path is used.
+
+    python benchmarks/import_time.py            # exit status 1 on failure
+    python benchmarks/import_time.py --scale 2  # relax budgets on slow machines
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Libraries that may only be imported by rendering / network code paths
+HEAVY = ('matplotlib', 'networkx', 'mpld3', 'pygame', 'requests')
+
+# Budgets in milliseconds; modules that use numpy pay for importing it
+STDLIB_BUDGET = 30
+NUMPY_BUDGET = 200
+
+# (module, name to import, budget in ms)
+CHECKS = [
+    ('collatz_graph', 'collatz_sequence', STDLIB_BUDGET),
+    ('collatz_stats', 'CollatzStats', NUMPY_BUDGET),
+    ('http_cache', 'ResponseCache', STDLIB_BUDGET),
+    ('json_stream', 'iter_array_items', STDLIB_BUDGET),
+    ('bouncing_ball', 'step', NUMPY_BUDGET),
+    ('bouncing_ball_explorer', 'sweep', NUMPY_BUDGET),
+    ('agenda', 'generate_agenda', NUMPY_BUDGET),
+    ('mandala_document', 'MandalaDocument', NUMPY_BUDGET),
+    ('mandala_geometry', 'symmetric_copies', NUMPY_BUDGET),
+    ('mandala_history', 'OperationLog', STDLIB_BUDGET),
+    ('mandala_index', 'StrokeIndex', NUMPY_BUDGET),
+    ('mandala_render', 'render_document', NUMPY_BUDGET),
+    ('mandala_raster', 'rasterize_document', NUMPY_BUDGET),
+    ('mandala_replay', 'replay_frames', NUMPY_BUDGET),
+    ('mandala_export', 'export_tiled', NUMPY_BUDGET),
+]
+
+
+def measure_import(module, name):
+    """Import module.name in a fresh interpreter.
+
+    Returns the cumulative import time of the module in milliseconds and
+    the names of all modules that were imported along with it.
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'from {module} import {name}'],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    cumulative = None
+    imported = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative_us, imported_name = line.split('|')
+        if not cumulative_us.strip().isdigit():
+            continue  # header line
+        imported.append(imported_name.strip())
+        if imported_name.strip() == module and imported_name.startswith(' ' + module):
+            cumulative = int(cumulative_us) / 1000
+    if cumulative is None:
+        raise RuntimeError(f"{module} did not appear in the import time report")
+    return cumulative, imported
+
+
+def run_checks(checks=CHECKS, repeat=5, scale=1.0):
+    """Run all checks and return a list of result dicts"""
+    results = []
+    for module, name, budget in checks:
+        timings = []
+        heavy = set()
+        for _ in range(repeat):
+            cumulative, imported = measure_import(module, name)
+            timings.append(cumulative)
+            heavy.update(mod.split('.')[0] for mod in imported if mod.split('.')[0] in HEAVY)
+        median = statistics.median(timings)
+        results.append({
+            'module': module,
+            'name': name,
+            'milliseconds': median,
+            'budget': budget * scale,
+            'heavy': sorted(heavy),
+            'ok': median <= budget * scale and not heavy,
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check import time budgets of the compute functions.")
+    parser.add_argument('--repeat', type=int, default=5, help="imports per check, the median is used")
+    parser.add_argument('--scale', type=float, default=1.0, help="multiply all budgets by this factor")
+    args = parser.parse_args()
+
+    results = run_checks(repeat=args.repeat, scale=args.scale)
+    for r in results:
+        status = 'ok' if r['ok'] else 'FAIL'
+        heavy = f"  imports {', '.join(r['heavy'])}" if r['heavy'] else ''
+        statement = f"from {r['module']} import {r['name']}"
+        print(f"{status:4}  {statement:<50} {r['milliseconds']:7.1f} ms "
+              f"(budget {r['budget']:.0f} ms){heavy}")
+    return 0 if all(r['ok'] for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
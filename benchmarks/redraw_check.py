@@ -0,0 +1,133 @@
+"""Check that incremental redraws of the pygame mandala layer are exact.
+
+The pygame creator keeps finished strokes in a cached layer and repairs only
+the damaged regions when strokes are erased or an erase is undone. Each
+scenario below drives the creator through mouse events and history calls,
+then compares the cached layer with a full rebuild (layer_key = None) pixel
+by pixel. Runs headless with the dummy SDL video driver.
+
+    python benchmarks/redraw_check.py   # exit status 1 on failure
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+LINE_WIDTHS = (1, 3, 5)
+
+
+def layer_pixels(app):
+    """RGBA pixels of the mandala layer as a (width, height, 4) array"""
+    import numpy as np
+    import pygame
+
+    return np.dstack([pygame.surfarray.array3d(app.mandala_layer),
+                      pygame.surfarray.array_alpha(app.mandala_layer)])
+
+
+def mismatched_pixels(app):
+    """Bring the layer up to date and count pixels that differ from a full rebuild"""
+    app.update_mandala_layer()
+    incremental = layer_pixels(app)
+    app.layer_key = None
+    app.snapshots.clear()
+    app.update_mandala_layer()
+    return int((incremental != layer_pixels(app)).any(axis=-1).sum())
+
+
+def click(app, points, button=1):
+    """Press a mouse button at the first point, drag through the rest and release it"""
+    import pygame
+
+    position = [(round(x + app.canvas_center_x), round(y + app.canvas_center_y)) for x, y in points]
+    app.handle_mouse_down(pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=position[0], button=button))
+    for pos in position[1:]:
+        app.handle_mouse_motion(pygame.event.Event(pygame.MOUSEMOTION, pos=pos))
+    app.handle_mouse_up(pygame.event.Event(pygame.MOUSEBUTTONUP, pos=position[-1], button=button))
+
+
+def stroke(x, y, length=80, points=12):
+    """A straight stroke from (x, y) to the right"""
+    return [(x + length * i / (points - 1), y + 0.3 * length * i / (points - 1)) for i in range(points)]
+
+
+def erase_after_new_stroke(app):
+    """Erase a stroke in the same event batch that finished a newer one, then undo the erase"""
+    click(app, stroke(-60, -120))
+    app.update_mandala_layer()
+    click(app, stroke(-40, 40))
+    click(app, [stroke(-60, -120)[6]], button=3)
+    mismatches = [mismatched_pixels(app)]
+    app.undo()
+    mismatches.append(mismatched_pixels(app))
+    return max(mismatches)
+
+
+def erase_and_undo(app):
+    """Erase one of several strokes, then undo and redo the erase"""
+    for i in range(6):
+        click(app, stroke(-150 + 40 * i, -150 + 50 * i))
+    app.update_mandala_layer()
+    click(app, [stroke(-70, -50)[4]], button=3)
+    mismatches = [mismatched_pixels(app)]
+    app.undo()
+    mismatches.append(mismatched_pixels(app))
+    app.redo()
+    mismatches.append(mismatched_pixels(app))
+    return max(mismatches)
+
+
+SCENARIOS = [
+    erase_after_new_stroke,
+    erase_and_undo,
+]
+
+
+def run_checks(line_widths=LINE_WIDTHS):
+    """Run every scenario at every line width and return a list of result dicts"""
+    import pygame
+    import mandala_creator_pygame
+    from mandala_creator_pygame import MandalaCreator
+
+    results = []
+    for scenario in SCENARIOS:
+        for partial_limit in (mandala_creator_pygame.PARTIAL_REDRAW_LIMIT, float('inf')):
+            for line_width in line_widths:
+                # An unlimited partial redraw repairs every region instead of rebuilding
+                default_limit = mandala_creator_pygame.PARTIAL_REDRAW_LIMIT
+                mandala_creator_pygame.PARTIAL_REDRAW_LIMIT = partial_limit
+                try:
+                    app = MandalaCreator()
+                    app.symmetry = 6
+                    app.line_width = line_width
+                    mismatches = scenario(app)
+                finally:
+                    mandala_creator_pygame.PARTIAL_REDRAW_LIMIT = default_limit
+                results.append({
+                    'scenario': scenario.__name__,
+                    'line_width': line_width,
+                    'partial_limit': partial_limit,
+                    'mismatches': mismatches,
+                    'ok': mismatches == 0,
+                })
+    pygame.quit()
+    return results
+
+
+def main():
+    results = run_checks()
+    for r in results:
+        status = 'ok' if r['ok'] else 'FAIL'
+        limit = 'unlimited' if r['partial_limit'] == float('inf') else f"{r['partial_limit']:g}"
+        print(f"{status:4}  {r['scenario']:<26} line width {r['line_width']}  "
+              f"partial limit {limit:<9} {r['mismatches']} pixels differ")
+    return 0 if all(r['ok'] for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,293 @@
+"""Time the hot paths of the scripts and compare them with a stored baseline.
+
+Covers the Collatz sequence, graph construction and layout at several sizes,
+one physics step of the bouncing ball and both mandala creators drawing
+synthetic strokes. Graphics run headless (Agg backend, dummy SDL video
+driver), so the suite also runs on machines without a display.
+
+    python benchmarks/run.py                      # compare with baseline.json
+    python benchmarks/run.py -k mandala           # only benchmarks matching 'mandala'
+    python benchmarks/run.py --output results.json
+    python benchmarks/run.py --update-baseline    # store the current timings
+
+The exit status is 1 if any benchmark is slower than its baseline by more
+than the tolerance. Timings depend on the machine, so refresh the baseline
+when moving to a different one, or after a change that speeds up a hot path.
+The baseline records the machine and the settings it was measured with.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Headless backends, set before matplotlib or pygame are imported
+os.environ.setdefault('MPLBACKEND', 'Agg')
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# Benchmarks slower than baseline * (1 + TOLERANCE) are reported as regressions
+TOLERANCE = 0.25
+
+# Each measurement runs the benchmark repeatedly for at least this many seconds
+MIN_TIME = 0.1
+
+# Seeds with Collatz sequences of 112, 351 and 525 numbers
+COLLATZ_SEEDS = (27, 77031, 837799)
+
+# Graphs of the sequences of all seeds from 1 to n
+LAYOUT_SIZES = (100, 1000, 10000)
+
+PHYSICS_STEPS = 1000
+
+# Synthetic strokes: (symmetry, points per stroke)
+STROKE_SIZES = ((8, 50), (8, 500), (24, 500))
+
+
+def synthetic_stroke(points, radius, seed=0):
+    """A wavy spiral stroke with the given number of points"""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    t = np.linspace(0, 4 * np.pi, points)
+    r = radius * (0.2 + 0.7 * t / t[-1]) * (1 + 0.05 * np.sin(7 * t))
+    r += rng.normal(0, radius * 0.002, points)
+    return list(zip(r * np.cos(t), r * np.sin(t)))
+
+
+def collatz_forest(n):
+    """Collatz graph of the sequences of all seeds from 1 to n"""
+    import networkx as nx
+    from collatz_graph import collatz_sequence
+
+    G = nx.DiGraph()
+    for seed in range(2, n + 1):
+        sequence = collatz_sequence(seed)
+        G.add_edges_from(zip(sequence, sequence[1:]))
+    return G
+
+
+def collatz_benchmarks():
+    from collatz_graph import collatz_sequence, create_collatz_graph, collatz_layout
+
+    for seed in COLLATZ_SEEDS:
+        yield f'collatz.sequence[{seed}]', lambda seed=seed: collatz_sequence(seed)
+
+    for seed in COLLATZ_SEEDS:
+        sequence = collatz_sequence(seed)
+        yield f'collatz.graph[{seed}]', lambda sequence=sequence: create_collatz_graph(sequence)
+
+    for size in LAYOUT_SIZES:
+        G = collatz_forest(size)
+        yield f'collatz.layout[{size}]', lambda G=G: collatz_layout(G)
+
+
+def physics_benchmarks():
+    import bouncing_ball
+
+    def run():
+        x, y = bouncing_ball.ball_x, bouncing_ball.ball_y
+        vx, vy = bouncing_ball.velocity_x, bouncing_ball.velocity_y
+        angle = 0
+        for _ in range(PHYSICS_STEPS):
+            angle += bouncing_ball.rotation_speed
+            x, y, vx, vy, _, _ = bouncing_ball.step(x, y, vx, vy, angle)
+
+    yield f'bouncing_ball.step[x{PHYSICS_STEPS}]', run
+
+
+def mandala_matplotlib_benchmarks():
+    import matplotlib.pyplot as plt
+    from mandala_creator import MandalaCreator
+
+    app = MandalaCreator()
+    color = app.get_color()
+
+    for symmetry, points in STROKE_SIZES:
+        stroke = synthetic_stroke(points, 1.0)
+
+        # Drawing only adds artists, so include rendering the canvas
+        def run(symmetry=symmetry, stroke=stroke):
+            app.symmetry = symmetry
+            app.draw_symmetry_guide()
+            app.draw_symmetrical_segment(stroke, color)
+            app.fig.canvas.draw()
+
+        yield f'mandala_matplotlib.segment[{symmetry}x{points}]', run
+
+    plt.close(app.fig)
+
+
+def mandala_pygame_benchmarks():
+    import pygame
+    from mandala_creator_pygame import MandalaCreator
+
+    app = MandalaCreator()
+    color = app.palettes[app.current_palette][0]
+
+    for symmetry, points in STROKE_SIZES:
+        stroke = synthetic_stroke(points, app.canvas_size / 2)
+
+        def run(symmetry=symmetry, stroke=stroke):
+            app.symmetry = symmetry
+            app.draw_symmetrical_segment(stroke, color)
+
+        yield f'mandala_pygame.segment[{symmetry}x{points}]', run
+
+    pygame.quit()
+
+
+SUITES = [
+    collatz_benchmarks,
+    physics_benchmarks,
+    mandala_matplotlib_benchmarks,
+    mandala_pygame_benchmarks,
+]
+
+
+def measure(function, repeat=5, min_time=MIN_TIME):
+    """Return the time of one call in seconds and the calls per measurement.
+
+    The number of calls per measurement is chosen so a measurement takes at
+    least min_time. The fastest of repeat measurements is reported, as slower
+    ones are mostly disturbed by other processes.
+    """
+    # Warm up caches and lazy imports before calibrating
+    function()
+
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 2 if elapsed == 0 else max(2, min(10, int(min_time / elapsed) + 1))
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        timings.append((time.perf_counter() - start) / number)
+    return min(timings), number
+
+
+def run_benchmarks(pattern=None, repeat=5, min_time=MIN_TIME):
+    """Run all benchmarks whose name contains pattern and return their results"""
+    results = {}
+    for suite in SUITES:
+        for name, function in suite():
+            if pattern and pattern not in name:
+                continue
+            seconds, number = measure(function, repeat, min_time)
+            results[name] = {'seconds': seconds, 'number': number, 'repeat': repeat}
+            print(f"{name:<40} {format_time(seconds):>10}", file=sys.stderr)
+    return results
+
+
+def compare(results, baseline):
+    """Return (name, seconds, baseline seconds, ratio) for every benchmark in both"""
+    rows = []
+    for name, result in results.items():
+        if name in baseline:
+            reference = baseline[name]['seconds']
+            rows.append((name, result['seconds'], reference, result['seconds'] / reference))
+    return rows
+
+
+def format_time(seconds):
+    """Format a duration with a unit that fits its magnitude"""
+    for unit, factor in (('s', 1), ('ms', 1e3), ('us', 1e6)):
+        if seconds * factor >= 1:
+            return f"{seconds * factor:.2f} {unit}"
+    return f"{seconds * 1e9:.0f} ns"
+
+
+def cpu_model():
+    """Name of the processor, from /proc/cpuinfo where available"""
+    try:
+        with open('/proc/cpuinfo', encoding='utf-8') as f:
+            for line in f:
+                if line.startswith('model name'):
+                    return line.split(':', 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+
+def load_baseline(path):
+    """Load the results stored in a baseline file, or an empty dict if it is missing"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)['results']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the hot paths and compare with a baseline.")
+    parser.add_argument('-k', dest='pattern', help="only run benchmarks whose name contains this")
+    parser.add_argument('--repeat', type=int, default=5, help="measurements per benchmark, the fastest is used")
+    parser.add_argument('--min-time', type=float, default=MIN_TIME, help="minimum seconds per measurement")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE,
+                        help="allowed slowdown relative to the baseline (0.25 = 25%%)")
+    parser.add_argument('--baseline', default=BASELINE, help="baseline JSON file")
+    parser.add_argument('--output', help="also write the results to this JSON file")
+    parser.add_argument('--update-baseline', action='store_true',
+                        help="store the results in the baseline file instead of comparing")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.pattern, args.repeat, args.min_time)
+    # The machine and settings the timings were taken with, stored next to the baseline
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'processor': cpu_model(),
+        'cpus': os.cpu_count(),
+        'settings': {'repeat': args.repeat, 'min_time': args.min_time,
+                     'mpl_backend': os.environ['MPLBACKEND'],
+                     'sdl_video_driver': os.environ['SDL_VIDEODRIVER']},
+        'results': results,
+    }
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.update_baseline:
+        # Keep the entries of benchmarks that were filtered out
+        report['results'] = {**load_baseline(args.baseline), **results}
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    regressions = 0
+    for name, seconds, reference, ratio in compare(results, baseline):
+        regressed = ratio > 1 + args.tolerance
+        regressions += regressed
+        status = 'SLOW' if regressed else 'ok'
+        print(f"{status:4}  {name:<40} {format_time(seconds):>10}  "
+              f"baseline {format_time(reference):>10}  {ratio:5.2f}x")
+    for name in results:
+        if name not in baseline:
+            print(f"new   {name:<40} {format_time(results[name]['seconds']):>10}")
+
+    if regressions:
+        print(f"{regressions} benchmark(s) slower than the baseline by more than {args.tolerance:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,8 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
-from matplotlib.patches import Circle, Rectangle, Polygon
 import math
+from collections import deque
+
+from frame_profiler import create_profiler
 
 
 # Constants
@@ -19,14 +19,6 @@ ball_x, ball_y = 0, 0  # Center of the triangle
 velocity_x, velocity_y = 0.15, 0.2
 rotation_speed = 0.01  # Radians per frame
 
-# Setup the figure and axis
-fig, ax = plt.subplots(figsize=(8, 8))
-ax.set_xlim(-WIDTH/2, WIDTH/2)
-ax.set_ylim(-HEIGHT/2, HEIGHT/2)
-ax.set_aspect('equal')
-ax.set_title('Ball Bouncing in a Rotating Triangle')
-ax.axis('off')
-
 # Create triangle vertices
 triangle_vertices = np.array([
     [0, TRIANGLE_SIZE/2],  # Top
@@ -34,18 +26,14 @@ triangle_vertices = np.array([
     [TRIANGLE_SIZE/2, -TRIANGLE_SIZE/2]  # Bottom right
 ])
 
-# Create the objects
-ball = Circle((ball_x, ball_y), BALL_RADIUS, color='red', zorder=2)
-triangle = Polygon(triangle_vertices, color='lightskyblue', alpha=0.5, zorder=1, 
-                   fill=True, edgecolor='blue', linewidth=2)
+# Corners as plain floats for the scalar physics code
+TRIANGLE_CORNERS = [tuple(corner) for corner in triangle_vertices.tolist()]
 
-# Add objects to the axis
-ax.add_patch(ball)
-ax.add_patch(triangle)
+# Number of recent positions drawn as the ball's path
+PATH_LENGTH = 1000
 
 # Track for plotting the ball's path
-path_x, path_y = [], []
-path_line, = ax.plot([], [], 'r-', alpha=0.7, linewidth=5)
+path_x, path_y = deque(maxlen=PATH_LENGTH), deque(maxlen=PATH_LENGTH)
 
 # Current rotation angle
 angle = 0
@@ -56,116 +44,193 @@ def is_inside_triangle(point, triangle_vertices):
     x1, y1 = triangle_vertices[0]
     x2, y2 = triangle_vertices[1]
     x3, y3 = triangle_vertices[2]
-    
+
     # Calculate area of the triangle
     area = 0.5 * abs((x1*(y2-y3) + x2*(y3-y1) + x3*(y1-y2)))
-    
+
     # Calculate barycentric coordinates
     alpha = abs((x2*y3 - x3*y2) + (y2-y3)*x + (x3-x2)*y) / (2 * area)
     beta = abs((x1*y3 - x3*y1) + (y1-y3)*x + (x3-x1)*y) / (2 * area)
     gamma = 1 - alpha - beta
-    
+
     # Check if the point is inside
     return 0 <= alpha <= 1 and 0 <= beta <= 1 and 0 <= gamma <= 1
 
-def init():
-    """Initialize the animation."""
-    ball.center = (ball_x, ball_y)
-    # Set the triangle vertices
-    triangle.set_xy(triangle_vertices)
-    path_line.set_data([], [])
-    return ball, triangle, path_line
-
-def update(frame):
-    """Update animation for each frame."""
-    global ball_x, ball_y, velocity_x, velocity_y, angle
-    
-    # Rotate the triangle
-    angle += rotation_speed
-    transform = plt.matplotlib.transforms.Affine2D().rotate_around(0, 0, angle) + ax.transData
-    triangle.set_transform(transform)
-    
-    # Get the corners of the rotated triangle
-    corners = triangle_vertices.copy()
-    
-    # Rotate the corners
-    rotated_corners = np.zeros_like(corners)
-    for i, (x, y) in enumerate(corners):
-        rotated_corners[i, 0] = x * math.cos(angle) - y * math.sin(angle)
-        rotated_corners[i, 1] = x * math.sin(angle) + y * math.cos(angle)
-    
+def rotate_triangle(angle):
+    """Return the corners of the triangle rotated around the origin."""
+    return np.array(rotated_corners(angle))
+
+def rotated_corners(angle):
+    """Return the rotated corners as a list of (x, y) float tuples."""
+    cos_a = math.cos(angle)
+    sin_a = math.sin(angle)
+    return [(x * cos_a - y * sin_a, x * sin_a + y * cos_a) for x, y in TRIANGLE_CORNERS]
+
+def step(ball_x, ball_y, velocity_x, velocity_y, angle):
+    """Move the ball one frame inside the triangle rotated by angle.
+
+    Returns the new position and velocity, whether the ball bounced off an
+    edge and whether it escaped and was reset to the center.
+    """
+    # Plain float arithmetic: for a single 2-D point NumPy's per-call overhead
+    # costs far more than the math itself
+    corners = rotated_corners(angle)
+
     # Calculate new position
-    new_ball_x = ball_x + velocity_x
-    new_ball_y = ball_y + velocity_y
-    
-    # Update ball position
-    ball_x = new_ball_x
-    ball_y = new_ball_y
-    
+    ball_x = ball_x + velocity_x
+    ball_y = ball_y + velocity_y
+
     collision_occurred = False
-    
+    escaped = False
+
     # Check for collisions with the sides of the rotated triangle
     for i in range(3):
         # Get two consecutive corners (wrapping around to the first for the last edge)
-        corner1 = rotated_corners[i]
-        corner2 = rotated_corners[(i + 1) % 3]
-        
-        # Vector from corner1 to corner2
-        edge_vector = corner2 - corner1
-        edge_length = np.linalg.norm(edge_vector)
-        edge_unit = edge_vector / edge_length
-        
-        # Vector from corner1 to ball
-        to_ball = np.array([ball_x, ball_y]) - corner1
-        
-        # Project to_ball onto the edge
-        projection_length = np.dot(to_ball, edge_unit)
-        projection = corner1 + projection_length * edge_unit if 0 <= projection_length <= edge_length else None
-        
-        if projection is not None:
-            # Distance from projection to ball
-            distance = np.linalg.norm(np.array([ball_x, ball_y]) - projection)
-            
-            # Check if the ball is colliding with this edge
-            if distance < BALL_RADIUS:
-                collision_occurred = True
-                # Normal vector to the edge (perpendicular)
-                normal = np.array([-edge_unit[1], edge_unit[0]])
-                
-                # Make sure the normal is pointing outward
-                if np.dot(normal, to_ball) < 0:
-                    normal = -normal
-                
-                # Reflect velocity across the normal
-                velocity = np.array([velocity_x, velocity_y])
-                reflection = velocity - 2 * np.dot(velocity, normal) * normal
-                velocity_x, velocity_y = reflection
-                
-                # Move the ball slightly away from the edge to prevent sticking
-                ball_x, ball_y = projection + normal * BALL_RADIUS * 1.01
-    
+        x1, y1 = corners[i]
+        x2, y2 = corners[(i + 1) % 3]
+
+        # Unit vector from corner1 to corner2
+        edge_length = math.hypot(x2 - x1, y2 - y1)
+        unit_x = (x2 - x1) / edge_length
+        unit_y = (y2 - y1) / edge_length
+
+        # Vector from corner1 to ball, projected onto the edge
+        to_ball_x = ball_x - x1
+        to_ball_y = ball_y - y1
+        projection_length = to_ball_x * unit_x + to_ball_y * unit_y
+        if not 0 <= projection_length <= edge_length:
+            continue
+        projection_x = x1 + projection_length * unit_x
+        projection_y = y1 + projection_length * unit_y
+
+        # Check if the ball is colliding with this edge
+        if math.hypot(ball_x - projection_x, ball_y - projection_y) < BALL_RADIUS:
+            collision_occurred = True
+            # Normal vector to the edge (perpendicular), pointing outward
+            normal_x, normal_y = -unit_y, unit_x
+            if normal_x * to_ball_x + normal_y * to_ball_y < 0:
+                normal_x, normal_y = -normal_x, -normal_y
+
+            # Reflect velocity across the normal
+            dot = velocity_x * normal_x + velocity_y * normal_y
+            velocity_x = velocity_x - 2 * dot * normal_x
+            velocity_y = velocity_y - 2 * dot * normal_y
+
+            # Move the ball slightly away from the edge to prevent sticking
+            ball_x = projection_x + normal_x * BALL_RADIUS * 1.01
+            ball_y = projection_y + normal_y * BALL_RADIUS * 1.01
+
     # If no collision occurred, check if the ball is still inside the triangle
     if not collision_occurred:
-        if not is_inside_triangle((ball_x, ball_y), rotated_corners):
+        if not is_inside_triangle((ball_x, ball_y), corners):
             # Ball has somehow escaped, reset to center
             ball_x, ball_y = 0, 0
+            escaped = True
+
+    return ball_x, ball_y, velocity_x, velocity_y, collision_occurred, escaped
+
+def main():
+    """Show the animation."""
+    # matplotlib is only needed for the animation, not for the physics above
+    import matplotlib.pyplot as plt
+    from matplotlib.animation import FuncAnimation
+    from matplotlib.patches import Circle, Polygon
+    from matplotlib.transforms import Affine2D
+
+    # Setup the figure and axis
+    fig, ax = plt.subplots(figsize=(8, 8))
+    ax.set_xlim(-WIDTH/2, WIDTH/2)
+    ax.set_ylim(-HEIGHT/2, HEIGHT/2)
+    ax.set_aspect('equal')
+    ax.set_title('Ball Bouncing in a Rotating Triangle')
+    ax.axis('off')
+
+    # Create the objects
+    ball = Circle((ball_x, ball_y), BALL_RADIUS, color='red', zorder=2)
+    triangle = Polygon(triangle_vertices, color='lightskyblue', alpha=0.5, zorder=1,
+                       fill=True, edgecolor='blue', linewidth=2)
+
+    # The triangle's rotation is updated in place every frame; the composite
+    # with the data transform is built once and picks up the changes
+    rotation = Affine2D()
+    triangle.set_transform(rotation + ax.transData)
+
+    # Add objects to the axis
+    ax.add_patch(ball)
+    ax.add_patch(triangle)
+
+    path_line, = ax.plot([], [], 'r-', alpha=0.7, linewidth=5)
     
-    # Update the ball's position
-    ball.center = (ball_x, ball_y)
-    
-    # Update path
-    path_x.append(ball_x)
-    path_y.append(ball_y)
-    path_line.set_data(path_x[-1000:], path_y[-1000:])  # Keep only the last 1000 points
-    
-    return ball, triangle, path_line
-
-# Create the animation
-ani = FuncAnimation(fig, update, frames=TOTAL_FRAMES,
-                    init_func=init, blit=True, interval=1000/FPS)
-
-# Update path with thicker line and longer history
-path_line.set_linewidth(3)  # Make the line thicker
-
-plt.tight_layout()
-plt.show() 
\ No newline at end of file
+    # Frame timings, enabled with PLAYGROUND_PROFILE
+    profiler = create_profiler('bouncing_ball')
+    overlay = ax.text(-WIDTH/2, HEIGHT/2 - 0.3, '', fontsize=9, color='gray', zorder=3)
+
+    def init():
+        """Initialize the animation."""
+        ball.center = (ball_x, ball_y)
+        # Set the triangle vertices
+        triangle.set_xy(triangle_vertices)
+        path_line.set_data([], [])
+        return ball, triangle, path_line
+
+    def update(frame):
+        """Update animation for each frame."""
+        global ball_x, ball_y, velocity_x, velocity_y, angle
+        # Time between frames is spent in the GUI event loop waiting for the timer
+        profiler.mark('idle')
+
+        # Rotate the triangle
+        angle += rotation_speed
+        rotation.clear().rotate(angle)
+
+        ball_x, ball_y, velocity_x, velocity_y, _, _ = step(ball_x, ball_y, velocity_x, velocity_y, angle)
+        profiler.mark('geometry')
+
+        # Update the ball's position
+        ball.center = (ball_x, ball_y)
+
+        # Update path
+        path_x.append(ball_x)
+        path_y.append(ball_y)
+        path_line.set_data(path_x, path_y)  # The deques keep only the last PATH_LENGTH points
+
+        if profiler.enabled:
+            overlay.set_text(profiler.overlay_text())
+            return ball, triangle, path_line, overlay
+        return ball, triangle, path_line
+
+    # Create the animation
+    ani = FuncAnimation(fig, update, frames=TOTAL_FRAMES,
+                        init_func=init, blit=True, interval=1000/FPS)
+
+    # Update path with thicker line and longer history
+    path_line.set_linewidth(3)  # Make the line thicker
+
+    if profiler.enabled:
+        canvas = fig.canvas
+        if canvas.supports_blit:
+            # Blitted frames draw the changed artists and then copy them to the screen
+            blit = canvas.blit
+
+            def profiled_blit(bbox=None):
+                profiler.mark('drawing')
+                blit(bbox)
+                profiler.mark('flip')
+                profiler.end_frame()
+
+            canvas.blit = profiled_blit
+        else:
+            # Without blitting every frame is a full redraw
+            def on_draw(event):
+                profiler.mark('drawing')
+                profiler.end_frame()
+
+            canvas.mpl_connect('draw_event', on_draw)
+
+    plt.tight_layout()
+    plt.show()
+    profiler.close()
+    return ani
+
+if __name__ == "__main__":
+    main()
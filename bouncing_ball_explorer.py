@@ -0,0 +1,222 @@
+"""Parameter sweeps of the bouncing ball physics.
+
+Simulates the ball of bouncing_ball.py without drawing it for every
+combination of initial velocity and rotation speed on a grid, and measures
+its long-run behaviour: how often it hits a wall, how often it escapes the
+triangle (and is put back in the center), and how much of the area it
+covers. Positions are binned into a coverage histogram as the simulation
+runs, so no trajectory is ever stored. Runs are independent and spread
+over worker processes:
+
+    python bouncing_ball_explorer.py --vx 0.05 0.4 8 --vy 0.05 0.4 8 \\
+        --rotation 0 0.04 3 --steps 20000 --jobs 8 -o sweep --plot coverage
+"""
+
+import argparse
+import csv
+import itertools
+import math
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from bouncing_ball import step, TRIANGLE_CORNERS, velocity_x, velocity_y, rotation_speed
+
+# Simulated frames per run
+STEPS = 10000
+
+# The coverage histogram has this many bins along each axis
+COVERAGE_BINS = 32
+
+# The rotating triangle stays inside the circle through its corners
+EXTENT = max(math.hypot(x, y) for x, y in TRIANGLE_CORNERS)
+
+# Columns of the results table
+COLUMNS = ('velocity_x', 'velocity_y', 'rotation_speed', 'steps', 'bounces', 'escapes',
+           'bounce_rate', 'escape_rate', 'first_escape', 'coverage')
+
+# Results that can be shown in the heatmap
+METRICS = ('bounce_rate', 'escape_rate', 'coverage')
+
+
+def coverage_cells(bins=COVERAGE_BINS):
+    """Return a (bins, bins) mask of the histogram cells whose center lies inside the corner circle"""
+    centers = (np.arange(bins) + 0.5) / bins * 2 * EXTENT - EXTENT
+    return np.hypot(centers[:, None], centers[None, :]) <= EXTENT
+
+
+def simulate(parameters, steps=STEPS, bins=COVERAGE_BINS):
+    """Run one simulation and return its statistics and coverage histogram
+
+    parameters is (velocity_x, velocity_y, rotation_speed); the ball starts in
+    the center and the triangle at angle 0, as in the animation.
+    """
+    vx, vy, speed = parameters
+    x, y = 0.0, 0.0
+    angle = 0.0
+    bounces = escapes = 0
+    first_escape = -1
+
+    # Visits per cell of a square over the corner circle, in plain Python for speed
+    counts = [0] * (bins * bins)
+    scale = bins / (2 * EXTENT)
+    for frame in range(steps):
+        angle += speed
+        x, y, vx, vy, bounced, escaped = step(x, y, vx, vy, angle)
+        bounces += bounced
+        if escaped:
+            escapes += 1
+            if first_escape < 0:
+                first_escape = frame
+        column = min(bins - 1, max(0, int((x + EXTENT) * scale)))
+        row = min(bins - 1, max(0, int((y + EXTENT) * scale)))
+        counts[row * bins + column] += 1
+
+    histogram = np.array(counts, dtype=np.int64).reshape(bins, bins)
+    cells = coverage_cells(bins)
+    stats = {
+        'velocity_x': parameters[0],
+        'velocity_y': parameters[1],
+        'rotation_speed': speed,
+        'steps': steps,
+        'bounces': bounces,
+        'escapes': escapes,
+        'bounce_rate': bounces / steps,
+        'escape_rate': escapes / steps,
+        'first_escape': first_escape,
+        'coverage': np.count_nonzero(histogram[cells]) / np.count_nonzero(cells),
+    }
+    return stats, histogram
+
+
+def parameter_grid(vx_values, vy_values, rotation_values):
+    """All (velocity_x, velocity_y, rotation_speed) combinations, rotation speed varying slowest"""
+    return [(vx, vy, speed) for speed, vx, vy in itertools.product(rotation_values, vx_values, vy_values)]
+
+
+def sweep(grid, steps=STEPS, jobs=1, bins=COVERAGE_BINS):
+    """Simulate every parameter combination, using jobs worker processes
+
+    Returns the statistics of every run in grid order and the coverage
+    histograms as one (runs, bins, bins) array.
+    """
+    if jobs == 1:
+        results = [simulate(parameters, steps, bins) for parameters in grid]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            chunk = max(1, len(grid) // (4 * jobs))
+            results = list(pool.map(simulate, grid, itertools.repeat(steps), itertools.repeat(bins),
+                                    chunksize=chunk))
+    stats = [run for run, _ in results]
+    histograms = np.stack([histogram for _, histogram in results]) if results else np.zeros((0, bins, bins))
+    return stats, histograms
+
+
+def write_results(stats, filename):
+    """Write the statistics of all runs to a CSV file"""
+    with open(filename, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for run in stats:
+            writer.writerow([round(run[column], 6) if isinstance(run[column], float) else run[column]
+                             for column in COLUMNS])
+
+
+def plot_heatmap(stats, metric, filename):
+    """Save one heatmap of metric over the velocity grid per rotation speed"""
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    vx_values = sorted({run['velocity_x'] for run in stats})
+    vy_values = sorted({run['velocity_y'] for run in stats})
+    rotation_values = sorted({run['rotation_speed'] for run in stats})
+    grids = {speed: np.full((len(vy_values), len(vx_values)), np.nan) for speed in rotation_values}
+    for run in stats:
+        grids[run['rotation_speed']][vy_values.index(run['velocity_y']),
+                                     vx_values.index(run['velocity_x'])] = run[metric]
+    low = min(np.nanmin(grid) for grid in grids.values())
+    high = max(np.nanmax(grid) for grid in grids.values())
+
+    columns = min(len(rotation_values), 4)
+    rows = -(-len(rotation_values) // columns)
+    fig = Figure(figsize=(4 * columns + 1, 4 * rows), facecolor='#222222')
+    FigureCanvasAgg(fig)
+    axes = fig.subplots(rows, columns, squeeze=False)
+    extent = (*cell_edges(vx_values), *cell_edges(vy_values))
+    for i, (ax, speed) in enumerate(zip(axes.flat, rotation_values)):
+        image = ax.imshow(grids[speed], origin='lower', extent=extent, aspect='auto',
+                          cmap='viridis', vmin=low, vmax=high, interpolation='nearest')
+        ax.set_title(f'rotation speed {speed:g}', color='white')
+        ax.set_xlabel('velocity x', color='white')
+        if i % columns == 0:
+            ax.set_ylabel('velocity y', color='white')
+        ax.tick_params(colors='white')
+    for ax in axes.flat[len(rotation_values):]:
+        ax.set_visible(False)
+    colorbar = fig.colorbar(image, ax=axes, shrink=0.8)
+    colorbar.set_label(metric.replace('_', ' '), color='white')
+    colorbar.ax.tick_params(colors='white')
+    fig.savefig(filename, facecolor=fig.get_facecolor())
+
+
+def cell_edges(values):
+    """Outer edges of heatmap cells centered on evenly spaced values"""
+    if len(values) > 1:
+        half = (values[-1] - values[0]) / (len(values) - 1) / 2
+    else:
+        half = abs(values[0]) / 2 or 0.5
+    return values[0] - half, values[-1] + half
+
+
+def parse_range(values):
+    """Turn [start, stop, count] into count evenly spaced values"""
+    start, stop, count = values
+    return np.linspace(start, stop, int(count)).round(6).tolist()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep the bouncing ball over a grid of parameters.")
+    parser.add_argument('--vx', type=float, nargs=3, metavar=('START', 'STOP', 'COUNT'),
+                        default=(velocity_x / 3, velocity_x * 2, 7), help="initial x velocities")
+    parser.add_argument('--vy', type=float, nargs=3, metavar=('START', 'STOP', 'COUNT'),
+                        default=(velocity_y / 3, velocity_y * 2, 7), help="initial y velocities")
+    parser.add_argument('--rotation', type=float, nargs=3, metavar=('START', 'STOP', 'COUNT'),
+                        default=(0, rotation_speed * 4, 3), help="rotation speeds in radians per frame")
+    parser.add_argument('--steps', type=int, default=STEPS, help="simulated frames per run")
+    parser.add_argument('--bins', type=int, default=COVERAGE_BINS, help="coverage histogram bins per axis")
+    parser.add_argument('--jobs', type=int, default=1, help="number of worker processes")
+    parser.add_argument('-o', '--output', default='bouncing_ball_sweep', help="prefix of the output files")
+    parser.add_argument('--plot', choices=METRICS, help="also save a heatmap of this result as <output>.png")
+    parser.add_argument('--histograms', action='store_true',
+                        help="also save the coverage histograms as <output>_histograms.npz")
+    args = parser.parse_args(argv)
+
+    if args.steps < 1 or args.bins < 1:
+        parser.error("steps and bins must be positive")
+    if min(args.vx[2], args.vy[2], args.rotation[2]) < 1:
+        parser.error("every range needs at least one value")
+
+    grid = parameter_grid(parse_range(args.vx), parse_range(args.vy), parse_range(args.rotation))
+    stats, histograms = sweep(grid, args.steps, args.jobs, args.bins)
+    print(f"{len(stats)} runs of {args.steps} steps")
+    for metric in METRICS:
+        values = [run[metric] for run in stats]
+        print(f"{metric}: min {min(values):.4f}, mean {np.mean(values):.4f}, max {max(values):.4f}")
+
+    filenames = [f"{args.output}.csv"]
+    write_results(stats, filenames[-1])
+    if args.histograms:
+        filenames.append(f"{args.output}_histograms.npz")
+        np.savez_compressed(filenames[-1], parameters=np.array(grid), histograms=histograms,
+                            extent=EXTENT)
+    if args.plot:
+        filenames.append(f"{args.output}.png")
+        plot_heatmap(stats, args.plot, filenames[-1])
+    for filename in filenames:
+        print(f"Wrote {filename}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,22 @@
-import networkx as nx
-import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.patches import FancyArrowPatch
-from matplotlib.colors import LinearSegmentedColormap
-import mpld3
 import webbrowser
 import os
 import tempfile
 
+# networkx, numpy, matplotlib and mpld3 are imported inside the functions that
+# need them, so importing collatz_sequence stays cheap.
+
+# Graphs with more nodes than this are drawn as a density map with a few labels
+LOD_THRESHOLD = 2000
+
+# Number of nodes labelled in level-of-detail mode
+TOP_K_LABELS = 40
+
+# Number of bins along the value axis of the density map
+DENSITY_BINS = 200
+
+# Larger interactive HTML output is replaced by a static image
+MAX_HTML_BYTES = 5 * 1024 * 1024
+
 def collatz_sequence(n):
     """Generate the Collatz sequence for a given number n."""
     sequence = [n]
@@ -21,20 +30,20 @@ def collatz_sequence(n):
 
 def create_collatz_graph(sequence):
     """Create a directed graph from the Collatz sequence."""
+    import networkx as nx
+
     G = nx.DiGraph()
     for i in range(len(sequence) - 1):
         G.add_edge(sequence[i], sequence[i + 1])
     return G
 
-def plot_collatz_graph(G):
-    """Plot the Collatz graph using matplotlib and display in web browser."""
-    # Create a dark style figure
-    plt.style.use('dark_background')
-    # Make figure wider for better browser fit
-    fig, ax = plt.subplots(figsize=(16, 9))  # Wider 16:9 aspect ratio for browser windows
-    fig.patch.set_facecolor('#222222')
-    ax.set_facecolor('#333333')
-    
+def collatz_layout(G):
+    """Compute node positions for the Collatz graph.
+
+    Returns the positions and the sequences traced from every start node.
+    """
+    import numpy as np
+
     # Create a custom layout
     pos = {}
     
@@ -89,7 +98,82 @@ def plot_collatz_graph(G):
             else:
                 horizontal_pos = np.log10(node) / np.log10(max_node_value)
             pos[node] = (horizontal_pos, 0)
-    
+
+    return pos, sequences
+
+def inverse_collatz_levels(k, max_value=None):
+    """Expand the inverse Collatz tree breadth-first from 1 for k levels.
+
+    Returns one (values, successors) pair of arrays per depth d = 0..k: the
+    numbers reaching 1 in exactly d steps and the number each one steps to.
+    Numbers above max_value are dropped together with their predecessors.
+    """
+    import numpy as np
+
+    # Values switch to Python integers before doubling could overflow int64
+    limit = np.iinfo(np.int64).max // 2
+
+    frontier = np.array([1], dtype=np.int64)
+    levels = [(frontier, np.empty(0, dtype=np.int64))]
+    for _ in range(k):
+        if frontier.dtype != object and len(frontier) and frontier.max() > limit:
+            frontier = frontier.astype(object)
+
+        # n is reached from 2n, and from (n - 1) / 3 when that is an odd integer above 1
+        doubled = frontier * 2
+        odd = frontier[(frontier % 6) == 4]
+        thirds = (odd - 1) // 3
+        keep = thirds > 1
+        odd, thirds = odd[keep], thirds[keep]
+
+        values = np.concatenate([doubled, thirds])
+        successors = np.concatenate([frontier, odd])
+        if max_value is not None:
+            keep = values <= max_value
+            values, successors = values[keep], successors[keep]
+
+        levels.append((values, successors))
+        frontier = values
+    return levels
+
+def create_inverse_collatz_graph(levels):
+    """Create a directed graph of the inverse tree, with edges pointing towards 1 like create_collatz_graph."""
+    import networkx as nx
+
+    G = nx.DiGraph()
+    G.add_node(1, depth=0)
+    for depth, (values, successors) in enumerate(levels[1:], start=1):
+        G.add_nodes_from(values.tolist(), depth=depth)
+        G.add_edges_from(zip(values.tolist(), successors.tolist()))
+    return G
+
+def inverse_collatz_layout(levels):
+    """Compute node positions and colors for the inverse tree.
+
+    Nodes are placed by logarithmic value and by depth, with 1 at the top.
+    Colors fade from light at the root to dark at the deepest level.
+    """
+    import numpy as np
+
+    max_node_value = max(int(values.max()) for values, _ in levels if len(values))
+    scale = np.log10(max_node_value) if max_node_value > 1 else 1.0
+    deepest = max(len(levels) - 1, 1)
+
+    pos = {}
+    colors = {}
+    for depth, (values, _) in enumerate(levels):
+        horizontal = np.log10(values.astype(float)) / scale
+        for node, x in zip(values.tolist(), horizontal.tolist()):
+            pos[node] = (x, -depth * 0.6)
+            colors[node] = 1 - depth / deepest
+    return pos, colors
+
+def draw_all_nodes(ax, G, pos, colors, sequences, cmap):
+    """Draw every edge as an arrow and every node with its label."""
+    import networkx as nx
+    import numpy as np
+    from matplotlib.patches import FancyArrowPatch
+
     # Draw edges with curved arrows
     for edge in G.edges():
         source, target = edge
@@ -114,8 +198,8 @@ def plot_collatz_graph(G):
     node_sizes = []
     node_colors = []
     
-    # Create a custom colormap that goes from dark orange to light orange
-    cmap = LinearSegmentedColormap.from_list('OrangeMap', ['#FF6B00', '#FFAB00'], N=256)
+    # Find the maximum node value for scaling
+    max_node_value = max(G.nodes())
     
     for node in G.nodes():
         # Size nodes based on value (with some minimum size)
@@ -123,6 +207,10 @@ def plot_collatz_graph(G):
         node_sizes.append(size)
         
         # Color can be based on sequence position for visual interest
+        if colors is not None:
+            node_colors.append(colors.get(node, 0.5))
+            continue
+        
         # Find the position in any sequence
         for seq in sequences:
             if node in seq:
@@ -155,6 +243,104 @@ def plot_collatz_graph(G):
         horizontalalignment='center',  # Center align text
         ax=ax
     )
+
+def draw_density(ax, G, pos, cmap):
+    """Draw the number of nodes per (log value, position) bin as a heatmap."""
+    import numpy as np
+    from matplotlib.colors import LogNorm
+
+    xy = np.array([pos[node] for node in G.nodes()], dtype=float)
+    
+    # One bin per distinct row (depth or sequence position), up to DENSITY_BINS rows
+    y_bins = max(1, min(DENSITY_BINS, len(np.unique(xy[:, 1]))))
+    counts, x_edges, y_edges = np.histogram2d(xy[:, 0], xy[:, 1], bins=(DENSITY_BINS, y_bins))
+    
+    # Empty bins are masked by the logarithmic norm and show the background
+    ax.imshow(counts.T, origin='lower', aspect='auto', interpolation='nearest', cmap=cmap,
+              norm=LogNorm(vmin=1, vmax=max(counts.max(), 1)), alpha=0.9, zorder=1,
+              extent=(x_edges[0], x_edges[-1], y_edges[0], y_edges[-1]))
+
+def significant_nodes(G, top_k):
+    """Return up to top_k nodes worth labelling in a large graph.
+
+    Half are the highest peaks (nodes reached from a smaller number that step
+    down again), the rest branch points where trajectories merge, smallest first.
+    """
+    import heapq
+
+    peaks = (node for node in G.nodes()
+             if any(p < node for p in G.predecessors(node))
+             and all(s < node for s in G.successors(node)))
+    selected = heapq.nlargest(top_k // 2, peaks)
+    
+    chosen = set(selected)
+    branches = (node for node in G.nodes() if G.in_degree(node) > 1 and node not in chosen)
+    selected.extend(heapq.nsmallest(top_k - len(selected), branches))
+    return selected
+
+def draw_significant_nodes(ax, G, pos, cmap, top_k):
+    """Mark and label the top_k significant nodes on top of the density map."""
+    nodes = significant_nodes(G, top_k)
+    if not nodes:
+        return
+    x = [pos[node][0] for node in nodes]
+    y = [pos[node][1] for node in nodes]
+    ax.scatter(x, y, s=60, c=[cmap(1.0)], edgecolors='white', linewidths=1, zorder=2)
+    for node, x0, y0 in zip(nodes, x, y):
+        ax.annotate(str(node), (x0, y0), xytext=(4, 4), textcoords='offset points',
+                    fontsize=9, color='white', zorder=3)
+
+def figure_html(fig, title, max_html_bytes=MAX_HTML_BYTES):
+    """Convert a figure to interactive mpld3 HTML, or to an embedded PNG if that gets too large."""
+    import base64
+    import io
+    import mpld3
+
+    plot_html = mpld3.fig_to_html(fig)
+    dpi = fig.dpi
+    while len(plot_html) > max_html_bytes and dpi >= 25:
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='png', dpi=dpi, facecolor=fig.get_facecolor())
+        data = base64.b64encode(buffer.getvalue()).decode('ascii')
+        plot_html = f'<img src="data:image/png;base64,{data}" alt="{title}">'
+        dpi /= 2
+    return plot_html
+
+def plot_collatz_graph(G, pos=None, colors=None, title='Collatz Sequence Graph',
+                       y_label='Sequence Position (Increasing ↓)', lod=None,
+                       top_k=TOP_K_LABELS, max_html_bytes=MAX_HTML_BYTES):
+    """Plot the Collatz graph using matplotlib and display in web browser.
+
+    pos and colors map nodes to positions and colormap values; by default the
+    graph is laid out with collatz_layout and colored by sequence position.
+    Graphs above LOD_THRESHOLD nodes (or with lod=True) are drawn as a
+    density map with only the top_k most significant nodes labelled.
+    """
+    import matplotlib.pyplot as plt
+    from matplotlib.colors import LinearSegmentedColormap
+
+    # Create a dark style figure
+    plt.style.use('dark_background')
+    # Make figure wider for better browser fit
+    fig, ax = plt.subplots(figsize=(16, 9))  # Wider 16:9 aspect ratio for browser windows
+    fig.patch.set_facecolor('#222222')
+    ax.set_facecolor('#333333')
+    
+    # Place nodes by logarithmic value and sequence position
+    sequences = []
+    if pos is None:
+        pos, sequences = collatz_layout(G)
+    
+    # Create a custom colormap that goes from dark orange to light orange
+    cmap = LinearSegmentedColormap.from_list('OrangeMap', ['#FF6B00', '#FFAB00'], N=256)
+    
+    if lod is None:
+        lod = G.number_of_nodes() > LOD_THRESHOLD
+    if lod:
+        draw_density(ax, G, pos, cmap)
+        draw_significant_nodes(ax, G, pos, cmap, top_k)
+    else:
+        draw_all_nodes(ax, G, pos, colors, sequences, cmap)
     
     # Set plot limits with some padding
     ax.set_xlim(-0.1, 1.1)
@@ -166,10 +352,10 @@ def plot_collatz_graph(G):
     ax.set_ylim(min_y - padding, max_y + padding)
     
     # Set axis titles
-    ax.set_title('Collatz Sequence Graph (Logarithmic Scale)', color='white', fontsize=18, pad=20)
+    ax.set_title(f'{title} (Logarithmic Scale)', color='white', fontsize=18, pad=20)
     ax.text(0.5, -0.05, 'Node Value (Log Scale →)', transform=ax.transAxes, 
             ha='center', va='center', color='white', fontsize=14)
-    ax.text(-0.05, 0.5, 'Sequence Position (Increasing ↓)', transform=ax.transAxes, 
+    ax.text(-0.05, 0.5, y_label, transform=ax.transAxes, 
             ha='center', va='center', color='white', fontsize=14, rotation=90)
     
     # Remove axis ticks and spines
@@ -180,6 +366,9 @@ def plot_collatz_graph(G):
     
     plt.tight_layout()
     
+    # Convert the matplotlib figure to HTML
+    plot_html = figure_html(fig, title, max_html_bytes)
+    
     # Generate HTML with a responsive container
     html_template = """
     <!DOCTYPE html>
@@ -209,17 +398,17 @@ def plot_collatz_graph(G):
                 flex: 1;
                 overflow: hidden;
             }}
-            .graph-container svg {{
+            .graph-container svg, .graph-container img {{
                 width: 100%;
                 height: 100%;
             }}
         </style>
-        <title>Collatz Sequence Graph</title>
+        <title>{title}</title>
     </head>
     <body>
         <div class="container">
             <div class="header">
-                <h2>Collatz Sequence Graph</h2>
+                <h2>{title}</h2>
             </div>
             <div class="graph-container">
                 {plot_html}
@@ -229,11 +418,8 @@ def plot_collatz_graph(G):
     </html>
     """
     
-    # Convert the matplotlib figure to HTML
-    plot_html = mpld3.fig_to_html(fig)
-    
     # Insert the plot HTML into our custom template
-    full_html = html_template.format(plot_html=plot_html)
+    full_html = html_template.format(plot_html=plot_html, title=title)
     
     # Create a temporary HTML file
     with tempfile.NamedTemporaryFile(suffix='.html', delete=False) as temp:
@@ -248,7 +434,22 @@ def plot_collatz_graph(G):
 
 # Example usage
 if __name__ == "__main__":
-    user_input = int(input("Enter a positive integer to generate its Collatz sequence: "))
-    sequence = collatz_sequence(user_input)
-    G = create_collatz_graph(sequence)
-    plot_collatz_graph(G)
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Plot Collatz sequences in the browser.")
+    parser.add_argument('--inverse', type=int, metavar='K',
+                        help="plot all numbers reaching 1 within K steps instead of one sequence")
+    parser.add_argument('--max-value', type=int, help="leave out numbers above this in the inverse tree")
+    args = parser.parse_args()
+
+    if args.inverse is not None:
+        levels = inverse_collatz_levels(args.inverse, args.max_value)
+        G = create_inverse_collatz_graph(levels)
+        pos, colors = inverse_collatz_layout(levels)
+        plot_collatz_graph(G, pos, colors, title='Inverse Collatz Tree',
+                           y_label='Steps to 1 (Increasing ↓)')
+    else:
+        user_input = int(input("Enter a positive integer to generate its Collatz sequence: "))
+        sequence = collatz_sequence(user_input)
+        G = create_collatz_graph(sequence)
+        plot_collatz_graph(G)
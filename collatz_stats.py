@@ -0,0 +1,281 @@
+"""Collatz statistics over large ranges of seeds.
+
+Computes the distribution of total stopping times (steps to reach 1), the
+record holders (seeds whose trajectory is longer, or whose peak is higher,
+than that of every smaller seed in the range) and a breakdown by residue
+class in a single pass. Seeds are processed in chunks of NumPy arrays, so
+no trajectory is ever stored, and the per-chunk aggregates merge into the
+same result in any grouping, which lets chunks run in parallel:
+
+    python collatz_stats.py 1 10000000 --jobs 8 -o stats --plot
+"""
+
+import argparse
+import csv
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import numpy as np
+
+# Seeds per chunk; a chunk needs a few arrays of this length
+CHUNK_SIZE = 1 << 18
+
+# Residue classes are taken modulo this by default
+MODULUS = 8
+
+# Largest odd value whose successor 3n + 1 still fits in an unsigned 64 bit integer
+MAX_ODD = (np.iinfo(np.uint64).max - 1) // 3
+
+
+def trajectory_stats(seeds):
+    """Return the total stopping time and the peak value of every seed.
+
+    Seeds whose trajectory would leave the range of 64 bit integers are
+    finished with Python integers, in which case the peaks are returned as
+    an object array.
+    """
+    values = np.asarray(seeds, dtype=np.uint64)
+    steps = np.zeros(len(values), dtype=np.int64)
+    peaks = values.copy()
+
+    # Only the seeds still on their way to 1 are iterated
+    index = np.flatnonzero(values > 1)
+    x = values[index]
+    overflow = []
+    while len(index):
+        odd = (x & 1).astype(bool)
+        too_big = odd & (x > MAX_ODD)
+        if too_big.any():
+            overflow.extend(index[too_big].tolist())
+            keep = ~too_big
+            index, x, odd = index[keep], x[keep], odd[keep]
+
+        x = np.where(odd, 3 * x + 1, x >> 1)
+        steps[index] += 1
+        rising = index[odd]
+        peaks[rising] = np.maximum(peaks[rising], x[odd])
+
+        done = x == 1
+        if done.any():
+            keep = ~done
+            index, x = index[keep], x[keep]
+
+    if overflow:
+        peaks = peaks.astype(object)
+        for i in overflow:
+            n = int(values[i])
+            count, peak = 0, n
+            while n != 1:
+                n = n // 2 if n % 2 == 0 else 3 * n + 1
+                count += 1
+                peak = max(peak, n)
+            steps[i] = count
+            peaks[i] = peak
+    return steps, peaks
+
+
+def running_records(seeds, values):
+    """Return the (seed, value) pairs where value exceeds all earlier values."""
+    values = np.asarray(values)
+    best = np.maximum.accumulate(values)
+    is_record = np.ones(len(values), dtype=bool)
+    is_record[1:] = values[1:] > best[:-1]
+    return [(int(seed), int(value)) for seed, value in zip(seeds[is_record], values[is_record])]
+
+
+def merge_records(*record_lists):
+    """Merge record lists of any seed ranges into the records of their union."""
+    merged = []
+    for seed, value in sorted(record for records in record_lists for record in records):
+        if not merged or value > merged[-1][1]:
+            merged.append((seed, value))
+    return merged
+
+
+class CollatzStats:
+    """Mergeable aggregate of the trajectories of a set of seeds."""
+
+    def __init__(self, modulus=MODULUS):
+        self.modulus = modulus
+        self.count = 0
+        self.first = None
+        self.last = None
+        self.histogram = np.zeros(0, dtype=np.int64)  # number of seeds per stopping time
+        self.step_records = []                        # (seed, stopping time) records
+        self.peak_records = []                        # (seed, peak) records
+        self.residue_count = np.zeros(modulus, dtype=np.int64)
+        self.residue_steps = np.zeros(modulus, dtype=np.int64)
+        self.residue_max = np.zeros(modulus, dtype=np.int64)
+
+    @classmethod
+    def for_range(cls, start, stop, modulus=MODULUS, chunk_size=CHUNK_SIZE):
+        """Aggregate the seeds start <= n < stop, chunk_size seeds at a time."""
+        stats = cls(modulus)
+        for chunk_start in range(start, stop, chunk_size):
+            stats.add(np.arange(chunk_start, min(chunk_start + chunk_size, stop), dtype=np.uint64))
+        return stats
+
+    def add(self, seeds):
+        """Add an increasing array of seeds."""
+        seeds = np.asarray(seeds, dtype=np.uint64)
+        if not len(seeds):
+            return
+        steps, peaks = trajectory_stats(seeds)
+
+        self.count += len(seeds)
+        self.first = int(seeds[0]) if self.first is None else min(self.first, int(seeds[0]))
+        self.last = int(seeds[-1]) if self.last is None else max(self.last, int(seeds[-1]))
+        self.histogram = add_padded(self.histogram, np.bincount(steps))
+        self.step_records = merge_records(self.step_records, running_records(seeds, steps))
+        self.peak_records = merge_records(self.peak_records, running_records(seeds, peaks))
+
+        residues = (seeds % self.modulus).astype(np.intp)
+        self.residue_count += np.bincount(residues, minlength=self.modulus)
+        self.residue_steps += np.bincount(residues, weights=steps, minlength=self.modulus).astype(np.int64)
+        np.maximum.at(self.residue_max, residues, steps)
+
+    def merge(self, other):
+        """Combine with the aggregate of another set of seeds."""
+        if other.modulus != self.modulus:
+            raise ValueError(f"cannot merge statistics modulo {self.modulus} and {other.modulus}")
+        if not other.count:
+            return self
+        self.first = other.first if self.first is None else min(self.first, other.first)
+        self.last = other.last if self.last is None else max(self.last, other.last)
+        self.count += other.count
+        self.histogram = add_padded(self.histogram, other.histogram)
+        self.step_records = merge_records(self.step_records, other.step_records)
+        self.peak_records = merge_records(self.peak_records, other.peak_records)
+        self.residue_count += other.residue_count
+        self.residue_steps += other.residue_steps
+        np.maximum(self.residue_max, other.residue_max, out=self.residue_max)
+        return self
+
+    def mean_steps(self):
+        """Mean stopping time over all seeds."""
+        return float(np.dot(np.arange(len(self.histogram)), self.histogram) / self.count)
+
+    def tables(self):
+        """Return the aggregates as {name: (column names, rows)}."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            residue_mean = self.residue_steps / self.residue_count
+        return {
+            'histogram': (('steps', 'count'),
+                          [(steps, int(count)) for steps, count in enumerate(self.histogram) if count]),
+            'records': (('kind', 'seed', 'value'),
+                        [('steps', seed, value) for seed, value in self.step_records] +
+                        [('peak', seed, value) for seed, value in self.peak_records]),
+            'residues': (('residue', 'modulus', 'count', 'mean_steps', 'max_steps'),
+                         [(r, self.modulus, int(self.residue_count[r]), round(float(residue_mean[r]), 4),
+                           int(self.residue_max[r])) for r in range(self.modulus) if self.residue_count[r]]),
+        }
+
+
+def add_padded(a, b):
+    """Add two count arrays of possibly different lengths."""
+    if len(a) < len(b):
+        a, b = b, a
+    result = a.copy()
+    result[:len(b)] += b
+    return result
+
+
+def range_stats(bounds, modulus=MODULUS):
+    """Aggregate one (start, stop) chunk; runs in a worker process."""
+    start, stop = bounds
+    return CollatzStats.for_range(start, stop, modulus)
+
+
+def sweep(start, stop, chunk_size=CHUNK_SIZE, jobs=1, modulus=MODULUS):
+    """Aggregate the seeds start <= n < stop, using jobs worker processes."""
+    chunks = [(a, min(a + chunk_size, stop)) for a in range(start, stop, chunk_size)]
+    stats = CollatzStats(modulus)
+    if jobs == 1:
+        for chunk in chunks:
+            stats.merge(range_stats(chunk, modulus))
+        return stats
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        for partial in pool.map(range_stats, chunks, repeat(modulus)):
+            stats.merge(partial)
+    return stats
+
+
+def write_tables(stats, prefix, file_format='csv'):
+    """Write every table to <prefix>_<name>.csv (or .parquet) and return the file names."""
+    filenames = []
+    for name, (columns, rows) in stats.tables().items():
+        filename = f"{prefix}_{name}.{file_format}"
+        if file_format == 'parquet':
+            # pyarrow is optional and only needed for Parquet output
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.table({column: [row[i] for row in rows] for i, column in enumerate(columns)})
+            pq.write_table(table, filename)
+        else:
+            with open(filename, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(columns)
+                writer.writerows(rows)
+        filenames.append(filename)
+    return filenames
+
+
+def plot_histogram(stats, filename):
+    """Save a bar chart of the stopping time distribution."""
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=(12, 6), facecolor='#222222')
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.set_facecolor('#333333')
+    ax.bar(np.arange(len(stats.histogram)), stats.histogram, width=1.0, color='#FF6B00')
+    ax.set_title(f'Collatz stopping times of seeds {stats.first} to {stats.last}', color='white', fontsize=16)
+    ax.set_xlabel('Steps to reach 1', color='white')
+    ax.set_ylabel('Seeds', color='white')
+    ax.tick_params(colors='white')
+    for spine in ax.spines.values():
+        spine.set_visible(False)
+    fig.tight_layout()
+    fig.savefig(filename, facecolor=fig.get_facecolor())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Collatz statistics for a range of seeds.")
+    parser.add_argument('first', type=int, help="first seed")
+    parser.add_argument('last', type=int, help="last seed (inclusive)")
+    parser.add_argument('--chunk', type=int, default=CHUNK_SIZE, help="seeds per chunk")
+    parser.add_argument('--jobs', type=int, default=1, help="number of worker processes")
+    parser.add_argument('--modulus', type=int, default=MODULUS, help="modulus of the residue classes")
+    parser.add_argument('-o', '--output', default='collatz_stats', help="prefix of the output files")
+    parser.add_argument('--format', choices=('csv', 'parquet'), default='csv', help="table file format")
+    parser.add_argument('--plot', action='store_true', help="also save a histogram as <output>_histogram.png")
+    args = parser.parse_args(argv)
+
+    if args.first < 1 or args.last < args.first:
+        parser.error("seeds must be positive and last must not be smaller than first")
+    if args.format == 'parquet':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            parser.error("Parquet output needs pyarrow (pip install pyarrow)")
+
+    stats = sweep(args.first, args.last + 1, args.chunk, args.jobs, args.modulus)
+    longest_seed, longest = stats.step_records[-1]
+    highest_seed, highest = stats.peak_records[-1]
+    print(f"{stats.count} seeds, mean stopping time {stats.mean_steps():.2f}")
+    print(f"longest trajectory: {longest_seed} ({longest} steps)")
+    print(f"highest peak: {highest_seed} (reaches {highest})")
+
+    filenames = write_tables(stats, args.output, args.format)
+    if args.plot:
+        filenames.append(f"{args.output}_histogram.png")
+        plot_histogram(stats, filenames[-1])
+    for filename in filenames:
+        print(f"Wrote {filename}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
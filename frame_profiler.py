@@ -0,0 +1,224 @@
+"""
+Opt-in frame timing and profiling for the interactive scripts.
+
+Profiling is switched on with the PLAYGROUND_PROFILE environment variable,
+a comma separated list of:
+
+    frames      per-frame timings split by phase and a live FPS overlay ('1' works too)
+    cprofile    run cProfile for the session and write <name>-<time>.prof
+    flamegraph  sample the main thread's stack and write <name>-<time>.folded,
+                collapsed stacks for flamegraph.pl, speedscope or inferno
+
+e.g. PLAYGROUND_PROFILE=frames,flamegraph python mandala_creator_pygame.py
+
+Files are written to PLAYGROUND_PROFILE_DIR (default: the current directory)
+when the session ends, together with <name>-<time>.frames.csv holding the
+timings of the last frames. When profiling is off, create_profiler returns a
+profiler whose methods do nothing, so the instrumented code needs no checks.
+
+A frame is the time between two end_frame() calls. mark(phase) attributes the
+time since the previous mark to a phase, so the phases add up to the frame.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+ENV_VAR = 'PLAYGROUND_PROFILE'
+DIRECTORY_ENV_VAR = 'PLAYGROUND_PROFILE_DIR'
+
+PHASES = ('events', 'geometry', 'drawing', 'flip', 'idle')
+
+# Number of frames kept in the ring buffer
+CAPACITY = 1024
+
+# Frames between updates of the overlay text
+OVERLAY_INTERVAL = 15
+
+# Seconds between stack samples of the flamegraph sampler
+SAMPLE_INTERVAL = 0.002
+
+class NullProfiler:
+    """
+    Stand-in used when profiling is off.
+    """
+    enabled = False
+
+    def mark(self, phase):
+        pass
+
+    def end_frame(self):
+        pass
+
+    def overlay_text(self):
+        return ''
+
+    def close(self):
+        pass
+
+class FrameProfiler:
+    """
+    Records phase timings of the most recent frames in a ring buffer.
+    """
+    enabled = True
+
+    def __init__(self, name, capacity=CAPACITY, cprofile=False, flamegraph=False, directory=None):
+        self.name = name
+        self.directory = directory or os.environ.get(DIRECTORY_ENV_VAR) or os.getcwd()
+        self.phase_index = {phase: i for i, phase in enumerate(PHASES)}
+
+        # One row per frame: the phase durations in seconds
+        self.timings = np.zeros((capacity, len(PHASES)))
+        self.current = np.zeros(len(PHASES))
+        self.frames = 0
+        self.last = time.perf_counter()
+        self.text = ''
+
+        self.profile = None
+        if cprofile:
+            import cProfile
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+
+        self.sampler = StackSampler() if flamegraph else None
+        if self.sampler:
+            self.sampler.start()
+
+    def mark(self, phase):
+        """
+        Attributes the time since the previous mark to phase.
+        """
+        now = time.perf_counter()
+        self.current[self.phase_index[phase]] += now - self.last
+        self.last = now
+
+    def end_frame(self):
+        """
+        Stores the current frame; time since the last mark counts as idle.
+        """
+        self.mark('idle')
+        self.timings[self.frames % len(self.timings)] = self.current
+        self.current[:] = 0
+        self.frames += 1
+        if self.frames % OVERLAY_INTERVAL == 0:
+            self.text = self.format_stats()
+
+    def recorded(self):
+        """
+        Returns the timings of the frames in the ring buffer, oldest first.
+        """
+        capacity = len(self.timings)
+        if self.frames <= capacity:
+            return self.timings[:self.frames]
+        return np.roll(self.timings, -(self.frames % capacity), axis=0)
+
+    def stats(self):
+        """
+        Returns FPS, median and 95th percentile frame time and the mean of every phase (seconds).
+        """
+        timings = self.recorded()
+        if not len(timings):
+            return None
+        totals = timings.sum(axis=1)
+        return {
+            'fps': len(totals) / totals.sum() if totals.sum() else 0.0,
+            'frame_p50': float(np.median(totals)),
+            'frame_p95': float(np.percentile(totals, 95)),
+            'phases': dict(zip(PHASES, timings.mean(axis=0).tolist())),
+        }
+
+    def format_stats(self):
+        """
+        One line summary of the recorded frames.
+        """
+        stats = self.stats()
+        if stats is None:
+            return ''
+        phases = '  '.join(f"{phase} {seconds * 1000:.1f}" for phase, seconds in stats['phases'].items())
+        return (f"{stats['fps']:.0f} FPS  frame {stats['frame_p50'] * 1000:.1f} ms "
+                f"(p95 {stats['frame_p95'] * 1000:.1f})  {phases}")
+
+    def overlay_text(self):
+        """
+        Summary to show on screen, refreshed every OVERLAY_INTERVAL frames.
+        """
+        return self.text
+
+    def close(self):
+        """
+        Stops profiling and writes the collected data.
+        """
+        prefix = os.path.join(self.directory, f"{self.name}-{time.strftime('%Y%m%d-%H%M%S')}")
+        written = []
+
+        if self.profile is not None:
+            self.profile.disable()
+            self.profile.dump_stats(prefix + '.prof')
+            written.append(prefix + '.prof')
+            self.profile = None
+
+        if self.sampler is not None:
+            self.sampler.stop()
+            self.sampler.write(prefix + '.folded')
+            written.append(prefix + '.folded')
+            self.sampler = None
+
+        timings = self.recorded()
+        if len(timings):
+            np.savetxt(prefix + '.frames.csv', timings * 1000, fmt='%.3f', delimiter=',',
+                       header=','.join(f"{phase}_ms" for phase in PHASES), comments='')
+            written.append(prefix + '.frames.csv')
+            print(f"{self.name}: {self.frames} frames, {self.format_stats()}", file=sys.stderr)
+
+        for filename in written:
+            print(f"Wrote {filename}", file=sys.stderr)
+
+class StackSampler(threading.Thread):
+    """
+    Samples the stack of one thread at a fixed interval and counts identical stacks.
+    """
+    def __init__(self, thread_id=None, interval=SAMPLE_INTERVAL):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id or threading.main_thread().ident
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+    def write(self, filename):
+        """
+        Writes the samples in the collapsed stack format, one 'stack count' line each.
+        """
+        with open(filename, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+def create_profiler(name):
+    """
+    Returns a FrameProfiler configured by PLAYGROUND_PROFILE, or a NullProfiler if it is unset.
+    """
+    options = {option.strip().lower() for option in os.environ.get(ENV_VAR, '').split(',')} - {'', '0'}
+    if not options:
+        return NullProfiler()
+    unknown = options - {'1', 'frames', 'cprofile', 'flamegraph'}
+    if unknown:
+        raise ValueError(f"unknown {ENV_VAR} options: {', '.join(sorted(unknown))}")
+    return FrameProfiler(name, cprofile='cprofile' in options, flamegraph='flamegraph' in options)
@@ -0,0 +1,129 @@
+"""Small on-disk cache for HTTP response bodies.
+
+Entries are stored as two files per key: the raw body and a JSON metadata
+file with the fetch time and the validators (ETag, Last-Modified) needed to
+revalidate an expired entry with a conditional request. The total size of
+stored bodies is bounded; the least recently used entries are evicted first.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from collections import namedtuple
+
+DEFAULT_DIRECTORY = os.path.join(os.path.expanduser('~'), '.cache', 'cursor_playground')
+
+CacheEntry = namedtuple('CacheEntry', ['body', 'fetched_at', 'etag', 'last_modified'])
+
+
+class ResponseCache:
+    """Response bodies on disk with TTL expiry and size-bounded eviction"""
+
+    def __init__(self, directory=DEFAULT_DIRECTORY, ttl=3 * 3600, max_bytes=50 * 1024 * 1024):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(*parts):
+        """Build a file-name safe key from the values identifying a request"""
+        return hashlib.sha256('\0'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+    def _paths(self, key):
+        base = os.path.join(self.directory, key)
+        return base + '.body', base + '.meta'
+
+    def get(self, key):
+        """Return the cached entry for key, or None"""
+        body_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+
+        # Mark the entry as recently used for eviction. Another thread sharing
+        # the cache may have evicted it since the read, the body is still good.
+        try:
+            os.utime(body_path)
+        except OSError:
+            pass
+        return CacheEntry(body, meta['fetched_at'], meta.get('etag'), meta.get('last_modified'))
+
+    def is_fresh(self, entry, now=None):
+        """Whether an entry is younger than the TTL"""
+        if now is None:
+            now = time.time()
+        return now - entry.fetched_at < self.ttl
+
+    def conditional_headers(self, entry):
+        """Request headers that revalidate an expired entry"""
+        headers = {}
+        if entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def put(self, key, body, etag=None, last_modified=None):
+        """Store a response body and its validators"""
+        body_path, meta_path = self._paths(key)
+        meta = {'fetched_at': time.time(), 'etag': etag, 'last_modified': last_modified}
+        self._write(body_path, body)
+        self._write(meta_path, json.dumps(meta).encode('utf-8'))
+        self.evict()
+
+    def touch(self, key):
+        """Restart the TTL of an entry after the server confirmed it is unchanged"""
+        entry = self.get(key)
+        if entry is None:
+            return None
+        meta = {'fetched_at': time.time(), 'etag': entry.etag, 'last_modified': entry.last_modified}
+        self._write(self._paths(key)[1], json.dumps(meta).encode('utf-8'))
+        return entry._replace(fetched_at=meta['fetched_at'])
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits max_bytes"""
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith('.body'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name[:-len('.body')]))
+            total += stat.st_size
+
+        for _, size, key in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            for path in self._paths(key):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= size
+
+    def clear(self):
+        """Remove all entries"""
+        for name in os.listdir(self.directory):
+            if name.endswith(('.body', '.meta')):
+                os.remove(os.path.join(self.directory, name))
+
+    def _write(self, path, data):
+        """Write a file atomically so readers never see partial entries"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
@@ -0,0 +1,132 @@
+"""
+Incremental parsing of large JSON documents.
+
+iter_array_items walks a JSON object chunk by chunk and yields the
+elements of one of its top-level arrays as they are completed, so only a
+single element (plus a small read buffer) is held in memory at a time.
+"""
+
+import codecs
+import json
+import os
+
+CHUNK_SIZE = 64 * 1024
+WHITESPACE = " \t\n\r"
+
+def iter_text(source, chunk_size=CHUNK_SIZE):
+    """
+    Yields decoded text chunks from a file path, a binary or text file
+    object, or an iterable of bytes/str chunks (e.g. response.iter_content()).
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            yield from iter_text(f, chunk_size)
+        return
+
+    if hasattr(source, "read"):
+        read = source.read
+        source = iter(lambda: read(chunk_size), read(0))
+
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    for chunk in source:
+        text = decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+class _Reader:
+    """
+    Text buffer over a stream of chunks with a read position.
+    """
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def fill(self, minimum=1):
+        """
+        Reads chunks until at least `minimum` more characters are buffered.
+        Returns False at the end of the stream.
+        """
+        # Drop the consumed part so the buffer only holds unread text
+        if self.pos:
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        target = len(self.buffer) + minimum
+        while len(self.buffer) < target:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                self.eof = True
+                return False
+            self.buffer += chunk
+        return True
+
+    def peek(self):
+        """
+        Returns the next non-whitespace character without consuming it, or '' at the end.
+        """
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, characters):
+        """
+        Consumes the next non-whitespace character, which must be one of characters.
+        """
+        char = self.peek()
+        if not char or char not in characters:
+            raise ValueError(f"expected one of {characters!r} in JSON stream, got {char!r}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        """
+        Decodes the next complete JSON value.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # A value at the very end of the buffer may be cut short (e.g. a number)
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # Grow the buffer geometrically so long values are not re-parsed too often
+            self.fill(max(CHUNK_SIZE, len(self.buffer) - self.pos))
+
+def iter_array_items(chunks, key):
+    """
+    Yields the elements of the array stored under `key` in a top-level JSON object.
+
+    Nothing is yielded if the key is missing; other members are decoded and discarded.
+    """
+    reader = _Reader(chunks)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+
+    while True:
+        name = reader.value()
+        reader.expect(":")
+        if name == key:
+            reader.expect("[")
+            if reader.peek() == "]":
+                return
+            while True:
+                yield reader.value()
+                if reader.expect(",]") == "]":
+                    return
+        reader.value()
+        if reader.expect(",}") == "}":
+            return
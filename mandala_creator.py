@@ -3,7 +3,35 @@ import matplotlib.pyplot as plt
 import matplotlib.colors as mcolors
 from matplotlib.widgets import Slider, Button, RadioButtons
 from matplotlib.collections import LineCollection
+from matplotlib.backend_bases import TimerBase
 import colorsys
+import os
+import sys
+import time
+
+from mandala_document import MandalaDocument, PALETTES, EXTENSION, REFERENCE_SIZE, rgb_to_hex, hex_to_rgb
+from mandala_render import save_document_image
+from mandala_geometry import symmetric_copies, guide_geometry, decimate
+from mandala_history import (OperationLog, SnapshotCache, STROKE, SYMMETRY, ROTATION,
+                             LINE_WIDTH, PALETTE, RESET, ERASE)
+from mandala_index import StrokeIndex
+
+# Width and height in pixels of saved images
+SAVE_SIZE = 3000
+
+# Slider changes are coalesced into at most one redraw per frame (milliseconds)
+FRAME_INTERVAL = 16
+
+# Maximum number of stroke points drawn in draft previews while a slider is dragged
+DRAFT_POINTS = 5000
+
+# Eraser radius and cell size of the stroke index, in data units (guide circle radius 1)
+ERASER_RADIUS = 0.03
+INDEX_CELL_SIZE = 0.1
+
+# Guide line colors
+GUIDE_CIRCLE_COLOR = mcolors.to_rgba('#444444', 0.5)
+GUIDE_AXIS_COLOR = mcolors.to_rgba('#444444', 0.3)
 
 class MandalaCreator:
     def __init__(self):
@@ -28,14 +56,8 @@ class MandalaCreator:
         self.ax_palette = plt.axes([0.1, 0.16, 0.1, 0.05])
         
         # Define color palettes
-        self.palettes = {
-            'Fire': ['#ff4500', '#ff8c00', '#ffd700', '#ff0000'],
-            'Ocean': ['#00008b', '#0000cd', '#00bfff', '#87ceeb'],
-            'Forest': ['#006400', '#228b22', '#32cd32', '#90ee90'],
-            'Sunset': ['#ff4500', '#ff6347', '#ff7f50', '#ffa07a'],
-            'Rainbow': ['#ff0000', '#ff7f00', '#ffff00', '#00ff00', '#0000ff', '#4b0082', '#9400d3'],
-            'Monochrome': ['#ffffff', '#cccccc', '#999999', '#666666', '#333333']
-        }
+        self.palettes = {name: [rgb_to_hex(color) for color in colors]
+                         for name, colors in PALETTES.items()}
         self.current_palette = 'Rainbow'
         
         # Sliders
@@ -70,10 +92,35 @@ class MandalaCreator:
         self.mandala_colors = []
         self.current_segment = []
         
+        # Time at which every point was drawn, in seconds since the session started
+        self.mandala_times = []
+        self.current_times = []
+        self.session_start = time.perf_counter()
+        self.time_offset = 0.0
+        
+        # Eraser state: strokes erased by the current drag
+        self.erasing = False
+        self.erased = []
+        
+        # Undo history and cached stroke geometry
+        self.history = OperationLog()
+        self.snapshots = SnapshotCache()
+        
+        # Rotated stroke copies by location, for the eraser
+        self.stroke_index = StrokeIndex(INDEX_CELL_SIZE, self.symmetry, self.rotation)
+        
+        # Pending slider redraws and draft quality previews
+        self.draft = False
+        self.redraw_pending = False
+        self.redraw_timer = self.fig.canvas.new_timer(interval=FRAME_INTERVAL)
+        self.redraw_timer.single_shot = True
+        self.redraw_timer.add_callback(self.flush_redraw)
+        
         # Connect events
         self.fig.canvas.mpl_connect('button_press_event', self.on_press)
         self.fig.canvas.mpl_connect('button_release_event', self.on_release)
         self.fig.canvas.mpl_connect('motion_notify_event', self.on_motion)
+        self.fig.canvas.mpl_connect('key_press_event', self.on_key)
         self.symmetry_slider.on_changed(self.update_symmetry)
         self.line_width_slider.on_changed(self.update_line_width)
         self.rotation_slider.on_changed(self.update_rotation)
@@ -87,7 +134,8 @@ class MandalaCreator:
         # Set title
         plt.figtext(0.5, 0.95, 'Interactive Mandala Creator', fontsize=20, 
                    ha='center', color='white')
-        plt.figtext(0.5, 0.92, 'Draw with your mouse to create a mandala design', 
+        plt.figtext(0.5, 0.92, 'Draw with your mouse to create a mandala design '
+                   '(right button to erase, Ctrl+Z to undo, Ctrl+Y to redo)', 
                    fontsize=12, ha='center', color='#cccccc')
     
     def draw_symmetry_guide(self):
@@ -100,18 +148,11 @@ class MandalaCreator:
         self.ax.set_ylim(-1.2, 1.2)
         self.ax.axis('off')
         
-        # Draw a circle
-        theta = np.linspace(0, 2*np.pi, 100)
-        x = np.cos(theta)
-        y = np.sin(theta)
-        self.ax.plot(x, y, color='#444444', linestyle='--', alpha=0.5)
-        
-        # Draw symmetry axes
-        rotation_rad = np.radians(self.rotation)
-        for i in range(self.symmetry):
-            angle = rotation_rad + i * (2*np.pi/self.symmetry)
-            self.ax.plot([0, np.cos(angle)], [0, np.sin(angle)], 
-                        color='#444444', linestyle='--', alpha=0.3)
+        # Draw the circle and symmetry axes, computed once per symmetry and rotation
+        circle, axes = guide_geometry(self.symmetry, self.rotation)
+        guide = LineCollection([circle, *axes], linestyles='--', zorder=1,
+                               colors=[GUIDE_CIRCLE_COLOR] + [GUIDE_AXIS_COLOR] * self.symmetry)
+        self.ax.add_collection(guide)
         
         # Redraw any existing mandala segments
         self.redraw_mandala()
@@ -125,12 +166,49 @@ class MandalaCreator:
     
     def redraw_mandala(self):
         """Redraw all mandala segments"""
+        if self.draft:
+            segments, colors = self.draft_geometry()
+        else:
+            segments, colors = self.mandala_geometry()
+        if segments:
+            line = LineCollection(segments, linewidths=self.line_width, 
+                                  colors=colors, alpha=0.8, zorder=2)
+            self.ax.add_collection(line)
+    
+    def mandala_geometry(self):
+        """Return the rotated copies of all segments and their colors"""
+        # Start from the latest snapshot and only rotate the segments after it
+        count = len(self.mandala_segments)
+        key = (self.symmetry, self.rotation, self.current_palette)
+        start, snapshot = self.snapshots.latest(count, key)
+        segments, colors = (list(snapshot[0]), list(snapshot[1])) if snapshot else ([], [])
+        
+        for index in range(start, count):
+            segment = self.mandala_segments[index]
+            if len(segment) > 1:
+                segments.extend(symmetric_copies(segment, self.symmetry, self.rotation))
+                colors.extend([self.mandala_colors[index]] * self.symmetry)
+            if self.snapshots.due(index + 1):
+                self.snapshots.store(index + 1, key, (list(segments), list(colors)))
+        
+        return segments, colors
+    
+    def draft_geometry(self):
+        """Return rotated copies of thinned out segments for quick previews"""
+        total_points = sum(len(segment) for segment in self.mandala_segments)
+        step = max(1, -(-total_points // DRAFT_POINTS))
+        
+        segments = []
+        colors = []
         for segment, color in zip(self.mandala_segments, self.mandala_colors):
-            self.draw_symmetrical_segment(segment, color)
+            if len(segment) > 1:
+                segments.extend(symmetric_copies(decimate(segment, step), self.symmetry, self.rotation))
+                colors.extend([color] * self.symmetry)
+        return segments, colors
     
     def draw_symmetrical_segment(self, segment, color):
         """Draw a segment with symmetry around the center"""
-        if not segment:
+        if len(segment) == 0:
             return
             
         # Convert segment to numpy array for easier manipulation
@@ -158,6 +236,11 @@ class MandalaCreator:
     
     def on_press(self, event):
         """Handle mouse button press event"""
+        if event.inaxes == self.ax and event.button == 3:
+            self.erasing = True
+            self.erased = []
+            self.erase_at(event.xdata, event.ydata)
+            return
         if event.inaxes != self.ax or event.button != 1:
             return
             
@@ -165,37 +248,22 @@ class MandalaCreator:
         self.current_segment = []
         # Convert mouse coordinates to be relative to center
         self.current_segment.append((event.xdata, event.ydata))
+        self.current_times = [self.timestamp()]
     
     def on_motion(self, event):
         """Handle mouse motion event"""
+        if self.erasing and event.inaxes == self.ax:
+            self.erase_at(event.xdata, event.ydata)
+            return
         if not self.drawing or event.inaxes != self.ax:
             return
             
         # Add the point to the current segment
         self.current_segment.append((event.xdata, event.ydata))
+        self.current_times.append(self.timestamp())
         
-        # Clear the axis and redraw
-        self.ax.cla()
-        self.ax.set_facecolor('#222222')
-        self.ax.set_aspect('equal')
-        self.ax.set_xlim(-1.2, 1.2)
-        self.ax.set_ylim(-1.2, 1.2)
-        self.ax.axis('off')
-        
-        # Redraw symmetry guide
-        theta = np.linspace(0, 2*np.pi, 100)
-        x = np.cos(theta)
-        y = np.sin(theta)
-        self.ax.plot(x, y, color='#444444', linestyle='--', alpha=0.5)
-        
-        rotation_rad = np.radians(self.rotation)
-        for i in range(self.symmetry):
-            angle = rotation_rad + i * (2*np.pi/self.symmetry)
-            self.ax.plot([0, np.cos(angle)], [0, np.sin(angle)], 
-                        color='#444444', linestyle='--', alpha=0.3)
-        
-        # Draw previous segments
-        self.redraw_mandala()
+        # Clear the axis and redraw the guide and previous segments
+        self.draw_symmetry_guide()
         
         # Draw current segment with symmetry
         color = self.get_color()
@@ -207,98 +275,266 @@ class MandalaCreator:
     def on_release(self, event):
         """Handle mouse button release event"""
         if self.drawing and len(self.current_segment) > 1:
+            # Snapshots past this point belong to strokes that were undone
+            self.snapshots.discard_after(len(self.mandala_segments))
             self.mandala_segments.append(self.current_segment)
             self.mandala_colors.append(self.get_color(len(self.mandala_segments)-1))
+            self.mandala_times.append(self.current_times)
+            self.history.record(STROKE, None, (self.current_segment, self.current_times))
+            self.stroke_index.update(self.mandala_segments, self.symmetry, self.rotation)
             self.drawing = False
+        
+        # One undo step for everything erased in a drag
+        if self.erasing:
+            if self.erased:
+                self.history.record(ERASE, self.erased, None)
+            self.erasing = False
+            self.erased = []
+        
+        # A slider drag ends here, the next one is a separate undo step
+        self.history.end_group()
+        
+        # A slider was let go: replace the draft preview with a full quality drawing
+        if self.draft:
+            self.draft = False
+            self.schedule_redraw()
+    
+    def erase_at(self, x, y):
+        """Erase every stroke with a copy under the eraser"""
+        self.stroke_index.update(self.mandala_segments, self.symmetry, self.rotation)
+        hits = self.stroke_index.query((x, y), ERASER_RADIUS)
+        if hits:
+            self.erased.extend((index, self.mandala_segments[index], self.mandala_times[index])
+                               for index in hits)
+            self.replace_strokes({index: ([], []) for index in hits})
+            self.draw_symmetry_guide()
+            self.fig.canvas.draw_idle()
+    
+    def replace_strokes(self, strokes):
+        """Replace strokes in place, given as {index: (points, times)}
+
+        Erased strokes stay as empty placeholders so the others keep their colors.
+        """
+        for index, (points, times) in strokes.items():
+            self.mandala_segments[index] = points
+            self.mandala_times[index] = times
+            self.stroke_index.remove(index)
+            self.stroke_index.add(index, points)
+        
+        # Snapshots that include a replaced stroke are out of date
+        self.snapshots.discard_after(min(strokes))
+    
+    def on_key(self, event):
+        """Handle undo and redo shortcuts"""
+        if event.key in ('ctrl+z', 'cmd+z'):
+            self.undo()
+        elif event.key in ('ctrl+y', 'cmd+y', 'ctrl+Z', 'cmd+Z', 'ctrl+shift+z', 'cmd+shift+z'):
+            self.redo()
     
     def update_symmetry(self, val):
         """Update the number of symmetry axes"""
+        self.history.record(SYMMETRY, self.symmetry, int(val))
         self.symmetry = int(val)
-        self.draw_symmetry_guide()
-        self.fig.canvas.draw_idle()
+        self.schedule_redraw(self.symmetry_slider)
     
     def update_line_width(self, val):
         """Update the line width"""
+        self.history.record(LINE_WIDTH, self.line_width, val)
         self.line_width = val
-        self.draw_symmetry_guide()
-        self.fig.canvas.draw_idle()
+        self.schedule_redraw(self.line_width_slider)
     
     def update_rotation(self, val):
         """Update the rotation of the mandala"""
+        self.history.record(ROTATION, self.rotation, val)
         self.rotation = val
+        self.schedule_redraw(self.rotation_slider)
+    
+    def schedule_redraw(self, slider=None):
+        """Redraw on the next frame, in draft quality while the slider is dragged"""
+        if slider is not None and slider.drag_active:
+            self.draft = True
+        if self.redraw_pending:
+            return
+        self.redraw_pending = True
+        
+        # Non-interactive backends have no event loop to run the timer
+        if type(self.redraw_timer) is TimerBase:
+            self.flush_redraw()
+        else:
+            self.redraw_timer.start()
+    
+    def flush_redraw(self):
+        """Perform a scheduled redraw"""
+        self.redraw_pending = False
         self.draw_symmetry_guide()
         self.fig.canvas.draw_idle()
     
     def reset(self, event):
         """Reset the mandala"""
+        self.history.record(RESET, (self.mandala_segments, self.mandala_times), None)
         self.mandala_segments = []
         self.mandala_colors = []
+        self.mandala_times = []
+        self.snapshots.clear()
+        self.stroke_index.clear()
         self.draw_symmetry_guide()
         self.fig.canvas.draw_idle()
     
+    def undo(self, event=None):
+        """Revert the most recent operation"""
+        operation = self.history.undo()
+        if operation is not None:
+            self.apply_operation(operation, undo=True)
+    
+    def redo(self, event=None):
+        """Apply the most recently undone operation again"""
+        operation = self.history.redo()
+        if operation is not None:
+            self.apply_operation(operation, undo=False)
+    
+    def apply_operation(self, operation, undo):
+        """Apply an operation from the history, or revert it if undo is set"""
+        value = operation.before if undo else operation.after
+        
+        if operation.kind == STROKE:
+            if undo:
+                self.mandala_segments.pop()
+                self.mandala_times.pop()
+                self.stroke_index.clear()
+            else:
+                segment, times = value
+                self.mandala_segments.append(segment)
+                self.mandala_times.append(times)
+        elif operation.kind == RESET:
+            segments, times = value if undo else ([], [])
+            self.mandala_segments = list(segments)
+            self.mandala_times = list(times)
+            self.stroke_index.clear()
+        elif operation.kind == ERASE:
+            if undo:
+                self.replace_strokes({index: (points, times) for index, points, times in operation.before})
+            else:
+                self.replace_strokes({index: ([], []) for index, _, _ in operation.before})
+        elif operation.kind == SYMMETRY:
+            self.symmetry = value
+            self.set_slider(self.symmetry_slider, value)
+        elif operation.kind == LINE_WIDTH:
+            self.line_width = value
+            self.set_slider(self.line_width_slider, value)
+        elif operation.kind == ROTATION:
+            self.rotation = value
+            self.set_slider(self.rotation_slider, value)
+        elif operation.kind == PALETTE:
+            self.set_palette(value)
+        
+        self.mandala_colors = [self.get_color(i) for i in range(len(self.mandala_segments))]
+        self.draw_symmetry_guide()
+        self.fig.canvas.draw_idle()
+    
+    def set_slider(self, slider, value):
+        """Move a slider without triggering its callbacks"""
+        slider.eventson = False
+        slider.set_val(value)
+        slider.eventson = True
+    
     def save(self, event):
         """Save the mandala as an image"""
-        # Hide the controls for the saved image
-        self.ax_symmetry.set_visible(False)
-        self.ax_line_width.set_visible(False)
-        self.ax_rotation.set_visible(False)
-        self.ax_reset.set_visible(False)
-        self.ax_save.set_visible(False)
-        self.ax_palette.set_visible(False)
-        
-        # Make the mandala take up the whole figure
-        self.ax.set_position([0.05, 0.05, 0.9, 0.9])
-        
-        # Draw a clean version for saving
-        self.ax.cla()
-        self.ax.set_facecolor('#222222')
-        self.ax.set_aspect('equal')
-        self.ax.set_xlim(-1.2, 1.2)
-        self.ax.set_ylim(-1.2, 1.2)
-        self.ax.axis('off')
-        self.redraw_mandala()
+        # Render off-screen so the interactive figure is left untouched
+        document = self.to_document()
+        filename = f'mandala_{self.symmetry}_axes.png'
+        save_document_image(document, filename, size=SAVE_SIZE)
+        print(f"Mandala saved as {filename}")
         
-        # Draw the mandala
-        self.fig.canvas.draw()
+        # Save the strokes alongside the image so the drawing can be reloaded
+        document_filename = os.path.splitext(filename)[0] + EXTENSION
+        document.save(document_filename)
+        print(f"Mandala document saved as {document_filename}")
+    
+    def to_document(self):
+        """Create a document from the current drawing"""
+        # The axes are already in document coordinates (guide circle radius 1)
+        return MandalaDocument.from_strokes(
+            self.mandala_segments,
+            times=self.mandala_times,
+            symmetry=self.symmetry,
+            rotation=self.rotation,
+            line_width=self.line_width * self.reference_pixels_per_point(),
+            palette_name=self.current_palette,
+            palette=[hex_to_rgb(color) for color in self.palettes[self.current_palette]]
+        )
+    
+    def reference_pixels_per_point(self):
+        """Document line width units (pixels at REFERENCE_SIZE) per point of line width on screen"""
+        # Diameter of the guide circle in screen pixels, with the equal aspect applied
+        self.ax.apply_aspect()
+        (left, _), (right, _) = self.ax.transData.transform([(-1, 0), (1, 0)])
+        return self.fig.dpi / 72 * REFERENCE_SIZE / (right - left)
+    
+    def load_document(self, filename):
+        """Replace the current drawing with a saved document"""
+        # The drawing outlives the document, so read the file instead of mapping it
+        document = MandalaDocument.load(filename, use_mmap=False)
         
-        # Save the figure
-        filename = f'mandala_{self.symmetry}_axes.png'
-        self.fig.savefig(filename, facecolor=self.fig.get_facecolor(), 
-                         bbox_inches='tight', pad_inches=0.1, dpi=300)
+        # Register palettes that this creator does not know about
+        if document.palette_name not in self.palettes:
+            self.palettes[document.palette_name] = [rgb_to_hex(color) for color in document.palette]
+        self.current_palette = document.palette_name
+        self.palette_button.label.set_text(self.current_palette)
         
-        # Restore the controls
-        self.ax_symmetry.set_visible(True)
-        self.ax_line_width.set_visible(True)
-        self.ax_rotation.set_visible(True)
-        self.ax_reset.set_visible(True)
-        self.ax_save.set_visible(True)
-        self.ax_palette.set_visible(True)
+        # Copy the points once, then split them into writable strokes
+        self.mandala_segments = np.split(document.points.copy(), document.offsets[1:-1].astype(np.intp))
+        self.mandala_colors = [self.get_color(i) for i in range(len(self.mandala_segments))]
         
-        # Restore the axis
-        self.ax.set_position([0.1, 0.25, 0.8, 0.7])
+        # Strokes of documents without timestamps count as drawn at the start;
+        # new strokes continue after the last stored timestamp
+        self.mandala_times = document.stroke_times() or [np.zeros(len(s)) for s in self.mandala_segments]
+        self.time_offset = 0.0
+        if document.timestamps is not None and len(document.timestamps):
+            self.time_offset = float(document.timestamps.max())
+        self.session_start = time.perf_counter()
+        
+        # Update the sliders without redrawing for each of them
+        line_width = document.line_width / self.reference_pixels_per_point()
+        self.set_slider(self.symmetry_slider, document.symmetry)
+        self.set_slider(self.line_width_slider, line_width)
+        self.set_slider(self.rotation_slider, document.rotation)
+        self.symmetry = document.symmetry
+        self.line_width = line_width
+        self.rotation = document.rotation
+        
+        # A loaded document starts a new history
+        self.history.clear()
+        self.snapshots.clear()
+        self.stroke_index.clear()
         
-        # Redraw
         self.draw_symmetry_guide()
         self.fig.canvas.draw_idle()
-        
-        print(f"Mandala saved as {filename}")
+    
+    def timestamp(self):
+        """Seconds since the drawing session started"""
+        return time.perf_counter() - self.session_start + self.time_offset
     
     def cycle_palette(self, event):
         """Cycle through the available color palettes"""
         palettes = list(self.palettes.keys())
         current_index = palettes.index(self.current_palette)
         next_index = (current_index + 1) % len(palettes)
-        self.current_palette = palettes[next_index]
+        self.history.record(PALETTE, self.current_palette, palettes[next_index])
+        self.set_palette(palettes[next_index])
+        
+        # Redraw
+        self.draw_symmetry_guide()
+        self.fig.canvas.draw_idle()
+    
+    def set_palette(self, name):
+        """Switch to a palette and recolor all segments"""
+        self.current_palette = name
         
         # Update the button text
         self.palette_button.label.set_text(self.current_palette)
         
         # Update colors for all segments
         self.mandala_colors = [self.get_color(i) for i in range(len(self.mandala_segments))]
-        
-        # Redraw
-        self.draw_symmetry_guide()
-        self.fig.canvas.draw_idle()
     
     def run(self):
         """Run the application"""
@@ -307,4 +543,6 @@ class MandalaCreator:
 
 if __name__ == "__main__":
     app = MandalaCreator()
+    if len(sys.argv) > 1:
+        app.load_document(sys.argv[1])
     app.run() 
\ No newline at end of file
@@ -3,9 +3,32 @@ import numpy as np
 import sys
 import os
 import math
+import time
 import colorsys
+from collections import OrderedDict
 from datetime import datetime
 
+from mandala_document import MandalaDocument, PALETTES, EXTENSION
+from mandala_render import save_document_image
+from mandala_geometry import guide_geometry, symmetric_copies
+from mandala_history import (OperationLog, SnapshotCache, STROKE, SYMMETRY, ROTATION,
+                             LINE_WIDTH, PALETTE, RESET, ERASE)
+from mandala_index import StrokeIndex
+from frame_profiler import create_profiler
+
+# Width and height in pixels of saved images
+SAVE_SIZE = 3000
+
+# Number of rendered symmetry guides kept around while sliders are moved
+GUIDE_CACHE_SIZE = 32
+
+# Eraser radius and cell size of the stroke index, in pixels
+ERASER_RADIUS = 10
+INDEX_CELL_SIZE = 32
+
+# Partial redraws touching more than this fraction of all segments redraw the whole layer
+PARTIAL_REDRAW_LIMIT = 0.3
+
 class MandalaCreator:
     def __init__(self):
         # Initialize pygame
@@ -26,16 +49,7 @@ class MandalaCreator:
         self.BLUE = (100, 100, 255)
         
         # Define color palettes
-        self.palettes = {
-            'Fire': [(255, 69, 0), (255, 140, 0), (255, 215, 0), (255, 0, 0)],
-            'Ocean': [(0, 0, 139), (0, 0, 205), (0, 191, 255), (135, 206, 235)],
-            'Forest': [(0, 100, 0), (34, 139, 34), (50, 205, 50), (144, 238, 144)],
-            'Sunset': [(255, 69, 0), (255, 99, 71), (255, 127, 80), (255, 160, 122)],
-            'Rainbow': [(255, 0, 0), (255, 127, 0), (255, 255, 0), (0, 255, 0), 
-                        (0, 0, 255), (75, 0, 130), (148, 0, 211)],
-            'Monochrome': [(255, 255, 255), (204, 204, 204), (153, 153, 153), 
-                          (102, 102, 102), (51, 51, 51)]
-        }
+        self.palettes = dict(PALETTES)
         self.current_palette = 'Rainbow'
         
         # Drawing settings
@@ -47,6 +61,17 @@ class MandalaCreator:
         self.mandala_colors = []
         self.current_segment = []
         
+        # Time at which every point was drawn, in seconds since the session started
+        self.mandala_times = []
+        self.current_times = []
+        self.session_start = time.perf_counter()
+        self.time_offset = 0.0
+        
+        # Eraser state: strokes erased by the current drag and the cursor position
+        self.erasing = False
+        self.erased = []
+        self.eraser_pos = None
+        
         # Canvas settings (centered in screen)
         self.canvas_size = min(self.screen_width, self.screen_height) - 200
         self.canvas_center_x = self.screen_width // 2
@@ -85,8 +110,29 @@ class MandalaCreator:
         self.active_slider = None
         self.active_button = None
         
+        # Finished segments are drawn once into this layer, which is blitted every frame.
+        # The margin leaves room for the widest line at the edge of the canvas.
+        layer_size = self.canvas_size + 2 * self.line_width_slider["max"]
+        self.layer_center = layer_size // 2
+        self.mandala_layer = pygame.Surface((layer_size, layer_size), pygame.SRCALPHA)
+        self.layer_key = None
+        self.layer_count = 0
+        
+        # Rendered symmetry guides, keyed by (symmetry, rotation)
+        self.guide_cache = OrderedDict()
+        
+        # Undo history and raster snapshots of the mandala layer
+        self.history = OperationLog()
+        self.snapshots = SnapshotCache()
+        
+        # Rotated stroke copies by location, for the eraser and partial redraws
+        self.stroke_index = StrokeIndex(INDEX_CELL_SIZE, self.symmetry, self.rotation)
+        
         # Clock for controlling frame rate
         self.clock = pygame.time.Clock()
+        
+        # Frame timings, enabled with PLAYGROUND_PROFILE
+        self.profiler = create_profiler("mandala_creator_pygame")
     
     def run(self):
         """Main game loop"""
@@ -105,48 +151,76 @@ class MandalaCreator:
                 
                 if event.type == pygame.MOUSEMOTION:
                     self.handle_mouse_motion(event)
+                
+                if event.type == pygame.KEYDOWN:
+                    self.handle_key_down(event)
+            self.profiler.mark('events')
+            
+            # Bring the cached guide and mandala layer up to date
+            self.get_guide_surface()
+            self.update_mandala_layer()
+            self.profiler.mark('geometry')
             
             # Update the display
             self.screen.fill(self.BLACK)
             self.draw_canvas()
             self.draw_ui()
+            self.draw_profiler_overlay()
+            self.profiler.mark('drawing')
             pygame.display.flip()
+            self.profiler.mark('flip')
             
             # Cap the frame rate
             self.clock.tick(60)
+            self.profiler.end_frame()
         
+        self.profiler.close()
         pygame.quit()
         sys.exit()
     
     def draw_canvas(self):
         """Draw the mandala canvas area with symmetry guides"""
+        guide = self.get_guide_surface()
+        self.screen.blit(guide, (self.canvas_center_x - guide.get_width() // 2,
+                                 self.canvas_center_y - guide.get_height() // 2))
+        
+        # Draw existing mandala segments
+        self.draw_mandala()
+    
+    def get_guide_surface(self):
+        """Return the canvas background with symmetry guides, rendered once per setting"""
+        key = (self.symmetry, self.rotation)
+        if key in self.guide_cache:
+            self.guide_cache.move_to_end(key)
+            return self.guide_cache[key]
+        
+        radius = self.canvas_size // 2
+        size = 2 * radius + 2
+        center = (size // 2, size // 2)
+        guide = pygame.Surface((size, size))
+        guide.fill(self.BLACK)
+        
         # Draw canvas background
-        pygame.draw.circle(self.screen, self.DARK_GRAY, 
-                          (self.canvas_center_x, self.canvas_center_y), 
-                          self.canvas_size // 2)
+        pygame.draw.circle(guide, self.DARK_GRAY, center, radius)
         
         # Draw boundary circle
-        pygame.draw.circle(self.screen, self.LIGHT_GRAY, 
-                          (self.canvas_center_x, self.canvas_center_y), 
-                          self.canvas_size // 2, 1)
+        pygame.draw.circle(guide, self.LIGHT_GRAY, center, radius, 1)
         
         # Draw symmetry axes
-        rotation_rad = math.radians(self.rotation)
-        for i in range(self.symmetry):
-            angle = rotation_rad + i * (2*math.pi/self.symmetry)
-            end_x = self.canvas_center_x + (self.canvas_size // 2) * math.cos(angle)
-            end_y = self.canvas_center_y + (self.canvas_size // 2) * math.sin(angle)
-            pygame.draw.line(self.screen, self.LIGHT_GRAY, 
-                            (self.canvas_center_x, self.canvas_center_y), 
-                            (end_x, end_y), 1)
-        
-        # Draw existing mandala segments
-        self.draw_mandala()
+        _, axes = guide_geometry(self.symmetry, self.rotation)
+        for (x0, y0), (x1, y1) in axes * radius + center:
+            pygame.draw.line(guide, self.LIGHT_GRAY, (x0, y0), (x1, y1), 1)
+        
+        self.guide_cache[key] = guide
+        if len(self.guide_cache) > GUIDE_CACHE_SIZE:
+            self.guide_cache.popitem(last=False)
+        return guide
     
     def draw_mandala(self):
         """Draw all mandala segments with symmetry"""
-        for segment, color in zip(self.mandala_segments, self.mandala_colors):
-            self.draw_symmetrical_segment(segment, color)
+        self.update_mandala_layer()
+        self.screen.blit(self.mandala_layer, (self.canvas_center_x - self.layer_center,
+                                              self.canvas_center_y - self.layer_center))
         
         # Draw current segment if drawing
         if self.drawing and len(self.current_segment) > 1:
@@ -154,44 +228,131 @@ class MandalaCreator:
             color_idx = len(self.mandala_segments) % len(self.palettes[self.current_palette])
             color = self.palettes[self.current_palette][color_idx]
             self.draw_symmetrical_segment(self.current_segment, color)
+        
+        # Outline of the eraser while it is used
+        if self.erasing and self.eraser_pos:
+            pygame.draw.circle(self.screen, self.LIGHT_GRAY, self.eraser_pos, ERASER_RADIUS, 1)
+    
+    def update_mandala_layer(self):
+        """Bring the cached mandala layer up to date with the finished segments"""
+        key = self.layer_settings()
+        count = len(self.mandala_segments)
+        
+        if key != self.layer_key:
+            # Settings changed or segments were removed: restart from the latest snapshot
+            start, snapshot = self.snapshots.latest(count, key)
+            if snapshot is None:
+                self.mandala_layer.fill((0, 0, 0, 0))
+            else:
+                self.mandala_layer = snapshot.copy()
+            self.layer_key = key
+            self.layer_count = start
+        
+        # Draw only the segments added since the last frame
+        center = (self.layer_center, self.layer_center)
+        for index in range(self.layer_count, count):
+            self.draw_symmetrical_segment(self.mandala_segments[index], self.mandala_colors[index],
+                                          self.mandala_layer, center)
+            if self.snapshots.due(index + 1):
+                self.snapshots.store(index + 1, key, self.mandala_layer.copy())
+        self.layer_count = count
+    
+    def layer_settings(self):
+        """Settings the mandala layer was drawn with"""
+        return (self.symmetry, self.rotation, self.line_width, self.current_palette)
+    
+    def invalidate_layer(self):
+        """Force the mandala layer and the stroke index to be rebuilt"""
+        self.layer_key = None
+        self.stroke_index.clear()
+    
+    def redraw_regions(self, rects):
+        """Redraw the mandala layer inside (x0, y0, x1, y1) canvas rectangles"""
+        # Thick lines reach up to half their width past their end points
+        margin = self.line_width + 1
+        index = self.stroke_index
+        regions = []
+        total = 0
+        for x0, y0, x1, y1 in rects:
+            left, top = math.floor(x0 - margin), math.floor(y0 - margin)
+            right, bottom = math.ceil(x1 + margin), math.ceil(y1 + margin)
+            clip = pygame.Rect(left + self.layer_center, top + self.layer_center,
+                               right - left + 1, bottom - top + 1)
+            numbers = index.segments_in_rect(left - margin, top - margin, right + margin, bottom + margin)
+            regions.append((clip, numbers))
+            
+            # Large regions are cheaper to rebuild from the latest snapshot
+            total += len(numbers)
+            if total > PARTIAL_REDRAW_LIMIT * index.size:
+                self.layer_key = None
+                return
+        
+        # Lines are drawn unclipped on a scratch layer, because pygame rasterizes
+        # lines crossing a clip edge differently, and only the region is copied back
+        scratch = pygame.Surface(self.mandala_layer.get_size(), pygame.SRCALPHA)
+        drawn = pygame.Rect(0, 0, 0, 0)
+        for clip, numbers in regions:
+            # Only the pixels touched for the previous region need clearing
+            scratch.fill((0, 0, 0, 0), drawn)
+            drawn = clip.copy()
+            # The segments drawn inside the region, in their original order
+            for start, end, owner in zip((index.starts[numbers] + self.layer_center).tolist(),
+                                         (index.ends[numbers] + self.layer_center).tolist(),
+                                         index.owner[numbers].tolist()):
+                drawn.union_ip(pygame.draw.line(scratch, self.mandala_colors[owner], start, end,
+                                                self.line_width))
+            # Adding to cleared pixels copies the scratch pixels, alpha included
+            self.mandala_layer.fill((0, 0, 0, 0), clip)
+            self.mandala_layer.blit(scratch, clip, clip, special_flags=pygame.BLEND_RGBA_ADD)
+    
+    def replace_strokes(self, strokes):
+        """Replace strokes in place, given as {index: (points, times)}, redrawing only what changed"""
+        # A layer drawn with the current settings is first caught up with strokes
+        # finished since the last frame, so only the damaged regions need redrawing.
+        # A layer drawn with other settings is rebuilt on the next frame anyway.
+        if self.layer_key == self.layer_settings():
+            self.update_mandala_layer()
+        partial = self.layer_key == self.layer_settings()
+        self.stroke_index.update(self.mandala_segments, self.symmetry, self.rotation)
+        dirty = []
+        for index, (points, times) in strokes.items():
+            dirty.extend(self.stroke_index.copy_bounds(index))
+            self.mandala_segments[index] = points
+            self.mandala_times[index] = times
+            self.stroke_index.remove(index)
+            self.stroke_index.add(index, points)
+            dirty.extend(self.stroke_index.copy_bounds(index))
+        
+        # Snapshots that include a replaced stroke are out of date
+        self.snapshots.discard_after(min(strokes))
+        if partial:
+            self.redraw_regions(dirty)
+    
+    def erase_at(self, canvas_x, canvas_y):
+        """Erase every stroke with a copy under the eraser"""
+        self.stroke_index.update(self.mandala_segments, self.symmetry, self.rotation)
+        hits = self.stroke_index.query((canvas_x, canvas_y), ERASER_RADIUS + self.line_width / 2)
+        if hits:
+            self.erased.extend((index, self.mandala_segments[index], self.mandala_times[index])
+                               for index in hits)
+            self.replace_strokes({index: ([], []) for index in hits})
     
-    def draw_symmetrical_segment(self, segment, color):
+    def draw_symmetrical_segment(self, segment, color, surface=None, center=None):
         """Draw a segment with symmetry around the center"""
-        if not segment or len(segment) < 2:
+        if len(segment) < 2:
             return
         
-        # Draw the segment in each symmetric position
-        rotation_rad = math.radians(self.rotation)
-        for i in range(self.symmetry):
-            angle = i * (2*math.pi/self.symmetry) + rotation_rad
-            
-            # Create rotation matrix
-            cos_a = math.cos(angle)
-            sin_a = math.sin(angle)
-            
-            # Draw lines connecting the points
-            for j in range(1, len(segment)):
-                # Get original points relative to canvas center
-                x1, y1 = segment[j-1]
-                x2, y2 = segment[j]
-                
-                # Rotate the points
-                x1_rot = x1 * cos_a - y1 * sin_a
-                y1_rot = x1 * sin_a + y1 * cos_a
-                x2_rot = x2 * cos_a - y2 * sin_a
-                y2_rot = x2 * sin_a + y2 * cos_a
-                
-                # Convert back to screen coordinates
-                x1_screen = self.canvas_center_x + x1_rot
-                y1_screen = self.canvas_center_y + y1_rot
-                x2_screen = self.canvas_center_x + x2_rot
-                y2_screen = self.canvas_center_y + y2_rot
-                
-                # Draw the line
-                pygame.draw.line(self.screen, color, 
-                               (x1_screen, y1_screen), 
-                               (x2_screen, y2_screen), 
-                               self.line_width)
+        # Draw on the screen around the canvas center unless told otherwise
+        if surface is None:
+            surface = self.screen
+        if center is None:
+            center = (self.canvas_center_x, self.canvas_center_y)
+        
+        # Draw the segment in each symmetric position, segment by segment
+        copies = symmetric_copies(segment, self.symmetry, self.rotation) + center
+        for rotated in copies.tolist():
+            for start, end in zip(rotated, rotated[1:]):
+                pygame.draw.line(surface, color, start, end, self.line_width)
     
     def draw_ui(self):
         """Draw all UI elements"""
@@ -199,7 +360,9 @@ class MandalaCreator:
         title_text = self.title_font.render("Interactive Mandala Creator", True, self.WHITE)
         self.screen.blit(title_text, (self.screen_width // 2 - title_text.get_width() // 2, 10))
         
-        subtitle_text = self.font.render("Draw with your mouse to create a mandala design", True, self.LIGHT_GRAY)
+        subtitle_text = self.font.render("Draw with your mouse to create a mandala design "
+                                         "(right button to erase, Ctrl+Z to undo, Ctrl+Y to redo)",
+                                         True, self.LIGHT_GRAY)
         self.screen.blit(subtitle_text, (self.screen_width // 2 - subtitle_text.get_width() // 2, 50))
         
         # Draw sliders
@@ -221,6 +384,12 @@ class MandalaCreator:
             pygame.draw.rect(self.screen, color, 
                            (palette_x + i * (square_size + 5), palette_y, square_size, square_size))
     
+    def draw_profiler_overlay(self):
+        """Draw the frame rate and phase timings when profiling is enabled"""
+        text = self.profiler.overlay_text()
+        if text:
+            self.screen.blit(self.font.render(text, True, self.LIGHT_GRAY), (10, self.screen_height - 110))
+    
     def draw_slider(self, slider):
         """Draw a slider control"""
         # Draw slider background
@@ -259,9 +428,17 @@ class MandalaCreator:
         canvas_y = y - self.canvas_center_y
         distance_from_center = math.sqrt(canvas_x**2 + canvas_y**2)
         
+        if distance_from_center <= (self.canvas_size // 2) and event.button == 3:
+            self.erasing = True
+            self.erased = []
+            self.eraser_pos = event.pos
+            self.erase_at(canvas_x, canvas_y)
+            return
+        
         if distance_from_center <= (self.canvas_size // 2):
             self.drawing = True
             self.current_segment = [(canvas_x, canvas_y)]
+            self.current_times = [self.timestamp()]
             return
         
         # Check sliders
@@ -293,12 +470,28 @@ class MandalaCreator:
                 color_idx = len(self.mandala_segments) % len(self.palettes[self.current_palette])
                 color = self.palettes[self.current_palette][color_idx]
                 
+                # Snapshots past this point belong to segments that were undone
+                self.snapshots.discard_after(len(self.mandala_segments))
                 self.mandala_segments.append(self.current_segment)
                 self.mandala_colors.append(color)
+                self.mandala_times.append(self.current_times)
+                self.history.record(STROKE, None, (self.current_segment, self.current_times))
+                self.stroke_index.update(self.mandala_segments, self.symmetry, self.rotation)
             
             self.drawing = False
             self.current_segment = []
+            self.current_times = []
         
+        if self.erasing:
+            # One undo step for everything erased in a drag
+            if self.erased:
+                self.history.record(ERASE, self.erased, None)
+            self.erasing = False
+            self.erased = []
+        
+        # A slider drag ends here, the next one is a separate undo step
+        if self.active_slider:
+            self.history.end_group()
         self.active_slider = None
     
     def handle_mouse_motion(self, event):
@@ -314,6 +507,14 @@ class MandalaCreator:
             # Keep drawing within canvas area
             if distance_from_center <= (self.canvas_size // 2):
                 self.current_segment.append((canvas_x, canvas_y))
+                self.current_times.append(self.timestamp())
+        
+        if self.erasing:
+            self.eraser_pos = event.pos
+            canvas_x = x - self.canvas_center_x
+            canvas_y = y - self.canvas_center_y
+            if math.hypot(canvas_x, canvas_y) <= (self.canvas_size // 2):
+                self.erase_at(canvas_x, canvas_y)
         
         # If dragging a slider, update its value
         if self.active_slider:
@@ -335,21 +536,100 @@ class MandalaCreator:
         elif slider == self.rotation_slider:
             new_value = round(new_value)  # Integer for rotation
         
+        # Record the change so it can be undone
+        if slider == self.symmetry_slider:
+            self.history.record(SYMMETRY, self.symmetry, new_value)
+        elif slider == self.line_width_slider:
+            self.history.record(LINE_WIDTH, self.line_width, new_value)
+        elif slider == self.rotation_slider:
+            self.history.record(ROTATION, self.rotation, new_value)
+        
+        self.set_slider(slider, new_value)
+    
+    def set_slider(self, slider, value):
+        """Set a slider and the property it controls"""
         # Update the actual value
-        slider["value"] = new_value
+        slider["value"] = value
         
         # Update corresponding property
         if slider == self.symmetry_slider:
-            self.symmetry = new_value
+            self.symmetry = value
         elif slider == self.line_width_slider:
-            self.line_width = new_value
+            self.line_width = value
         elif slider == self.rotation_slider:
-            self.rotation = new_value
+            self.rotation = value
+    
+    def handle_key_down(self, event):
+        """Handle undo and redo shortcuts"""
+        if not event.mod & (pygame.KMOD_CTRL | pygame.KMOD_META):
+            return
+        if event.key == pygame.K_z and event.mod & pygame.KMOD_SHIFT or event.key == pygame.K_y:
+            self.redo()
+        elif event.key == pygame.K_z:
+            self.undo()
+    
+    def undo(self):
+        """Revert the most recent operation"""
+        operation = self.history.undo()
+        if operation is not None:
+            self.apply_operation(operation, undo=True)
+    
+    def redo(self):
+        """Apply the most recently undone operation again"""
+        operation = self.history.redo()
+        if operation is not None:
+            self.apply_operation(operation, undo=False)
+    
+    def apply_operation(self, operation, undo):
+        """Apply an operation from the history, or revert it if undo is set"""
+        value = operation.before if undo else operation.after
+        
+        if operation.kind == STROKE:
+            if undo:
+                self.mandala_segments.pop()
+                self.mandala_colors.pop()
+                self.mandala_times.pop()
+                self.invalidate_layer()
+            else:
+                palette = self.palettes[self.current_palette]
+                segment, times = value
+                self.mandala_segments.append(segment)
+                self.mandala_colors.append(palette[(len(self.mandala_segments) - 1) % len(palette)])
+                self.mandala_times.append(times)
+        elif operation.kind == RESET:
+            if undo:
+                segments, times = value
+                self.mandala_segments = list(segments)
+                self.mandala_times = list(times)
+                palette = self.palettes[self.current_palette]
+                self.mandala_colors = [palette[i % len(palette)] for i in range(len(segments))]
+            else:
+                self.mandala_segments = []
+                self.mandala_colors = []
+                self.mandala_times = []
+            self.invalidate_layer()
+        elif operation.kind == ERASE:
+            if undo:
+                self.replace_strokes({index: (points, times) for index, points, times in operation.before})
+            else:
+                self.replace_strokes({index: ([], []) for index, _, _ in operation.before})
+        elif operation.kind == SYMMETRY:
+            self.set_slider(self.symmetry_slider, value)
+        elif operation.kind == LINE_WIDTH:
+            self.set_slider(self.line_width_slider, value)
+        elif operation.kind == ROTATION:
+            self.set_slider(self.rotation_slider, value)
+        elif operation.kind == PALETTE:
+            self.set_palette(value)
     
     def reset_mandala(self):
         """Clear the mandala"""
+        self.history.record(RESET, (self.mandala_segments, self.mandala_times), None)
         self.mandala_segments = []
         self.mandala_colors = []
+        self.mandala_times = []
+        self.snapshots.clear()
+        self.invalidate_layer()
     
     def save_mandala(self):
         """Save the mandala as a PNG image"""
@@ -357,16 +637,88 @@ class MandalaCreator:
         timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
         filename = f"mandala_{self.symmetry}_axes_{timestamp}.png"
         
-        # Save the current surface
-        pygame.image.save(self.screen, filename)
+        # Render the drawing off-screen instead of capturing the window and its controls
+        document = self.to_document()
+        save_document_image(document, filename, size=SAVE_SIZE)
         print(f"Saved mandala as {filename}")
+        
+        # Save the strokes alongside the image so the drawing can be reloaded
+        document_filename = os.path.splitext(filename)[0] + EXTENSION
+        document.save(document_filename)
+        print(f"Saved mandala document as {document_filename}")
+    
+    def to_document(self):
+        """Create a document from the current drawing"""
+        # Documents use a unit radius with y pointing up, the canvas uses
+        # pixels with y pointing down, which also mirrors the rotation
+        radius = self.canvas_size // 2
+        strokes = [np.asarray(segment, dtype=np.float32).reshape(-1, 2) * (1 / radius, -1 / radius)
+                   for segment in self.mandala_segments]
+        return MandalaDocument.from_strokes(
+            strokes,
+            times=self.mandala_times,
+            symmetry=self.symmetry,
+            rotation=-self.rotation % 360,
+            line_width=self.line_width,
+            palette_name=self.current_palette,
+            palette=self.palettes[self.current_palette]
+        )
+    
+    def load_document(self, filename):
+        """Replace the current drawing with a saved document"""
+        # The drawing outlives the document, so read the file instead of mapping it
+        document = MandalaDocument.load(filename, use_mmap=False)
+        
+        # Register palettes that this creator does not know about
+        if document.palette_name not in self.palettes:
+            self.palettes[document.palette_name] = document.palette
+        self.current_palette = document.palette_name
+        self.palette_button["text"] = self.current_palette
+        
+        # Convert all points to canvas pixels at once, then split into strokes
+        radius = self.canvas_size // 2
+        points = document.points * (radius, -radius)
+        self.mandala_segments = np.split(points, document.offsets[1:-1].astype(np.intp))
+        palette = self.palettes[self.current_palette]
+        self.mandala_colors = [palette[i % len(palette)] for i in range(len(self.mandala_segments))]
+        
+        # Strokes of documents without timestamps count as drawn at the start;
+        # new strokes continue after the last stored timestamp
+        self.mandala_times = document.stroke_times() or [np.zeros(len(s)) for s in self.mandala_segments]
+        self.time_offset = 0.0
+        if document.timestamps is not None and len(document.timestamps):
+            self.time_offset = float(document.timestamps.max())
+        self.session_start = time.perf_counter()
+        
+        # Sliders work with integer values
+        self.symmetry = min(max(document.symmetry, self.symmetry_slider["min"]), self.symmetry_slider["max"])
+        self.line_width = min(max(int(round(document.line_width)), self.line_width_slider["min"]),
+                              self.line_width_slider["max"])
+        self.rotation = round(-document.rotation) % 360
+        self.symmetry_slider["value"] = self.symmetry
+        self.line_width_slider["value"] = self.line_width
+        self.rotation_slider["value"] = self.rotation
+        
+        # A loaded document starts a new history
+        self.history.clear()
+        self.snapshots.clear()
+        self.invalidate_layer()
+    
+    def timestamp(self):
+        """Seconds since the drawing session started"""
+        return time.perf_counter() - self.session_start + self.time_offset
     
     def cycle_palette(self):
         """Switch to the next color palette"""
         palettes = list(self.palettes.keys())
         current_index = palettes.index(self.current_palette)
         next_index = (current_index + 1) % len(palettes)
-        self.current_palette = palettes[next_index]
+        self.history.record(PALETTE, self.current_palette, palettes[next_index])
+        self.set_palette(palettes[next_index])
+    
+    def set_palette(self, name):
+        """Switch to a palette and recolor all segments"""
+        self.current_palette = name
         
         # Update the button text
         self.palette_button["text"] = self.current_palette
@@ -379,4 +731,6 @@ class MandalaCreator:
 
 if __name__ == "__main__":
     app = MandalaCreator()
+    if len(sys.argv) > 1:
+        app.load_document(sys.argv[1])
     app.run() 
\ No newline at end of file
@@ -0,0 +1,217 @@
+"""Compact binary document format for mandala drawings.
+
+A document stores the render parameters (symmetry, rotation, line width and
+palette) together with every stroke of a drawing. Strokes are packed into a
+single float32 array of points plus an offsets array, so a file can be
+memory-mapped and wrapped with ``numpy.frombuffer`` without copying or
+parsing individual points.
+
+Coordinates are normalised so the symmetry guide circle has radius 1, with y
+pointing up and rotation measured in degrees counter-clockwise. The
+line width is given in pixels for the reference canvas size
+(``REFERENCE_SIZE``) and is scaled by renderers for other output sizes.
+
+File layout (little endian):
+
+    header      magic, version, flags, symmetry, rotation, line width,
+                stroke count, point count, palette name length, color count
+    palette     palette name (utf-8) followed by RGB triples (uint8)
+    padding     zero bytes up to the next multiple of 8
+    offsets     uint64[stroke count + 1], start index of each stroke
+    points      float32[point count, 2]
+    timestamps  float32[point count], only if flags has FLAG_TIMESTAMPS set
+
+Timestamps record when each point was drawn, in seconds since the start of
+the drawing session, and let the drawing be replayed (see mandala_replay).
+"""
+
+import mmap
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+MAGIC = b'MNDL'
+VERSION = 1
+EXTENSION = '.mandala'
+
+# Diameter in pixels of the canvas the stored line width refers to
+REFERENCE_SIZE = 600
+
+HEADER = struct.Struct('<4sHHIffIQHH')
+
+# Header flags
+FLAG_TIMESTAMPS = 1
+
+# Color palettes shared by the mandala tools
+PALETTES = {
+    'Fire': [(255, 69, 0), (255, 140, 0), (255, 215, 0), (255, 0, 0)],
+    'Ocean': [(0, 0, 139), (0, 0, 205), (0, 191, 255), (135, 206, 235)],
+    'Forest': [(0, 100, 0), (34, 139, 34), (50, 205, 50), (144, 238, 144)],
+    'Sunset': [(255, 69, 0), (255, 99, 71), (255, 127, 80), (255, 160, 122)],
+    'Rainbow': [(255, 0, 0), (255, 127, 0), (255, 255, 0), (0, 255, 0),
+                (0, 0, 255), (75, 0, 130), (148, 0, 211)],
+    'Monochrome': [(255, 255, 255), (204, 204, 204), (153, 153, 153),
+                   (102, 102, 102), (51, 51, 51)]
+}
+
+
+def rgb_to_hex(color):
+    """Convert an (r, g, b) tuple to a '#rrggbb' string"""
+    return '#{:02x}{:02x}{:02x}'.format(*color)
+
+
+def hex_to_rgb(color):
+    """Convert a '#rrggbb' string to an (r, g, b) tuple"""
+    color = color.lstrip('#')
+    return tuple(int(color[i:i + 2], 16) for i in (0, 2, 4))
+
+
+def _padding(size):
+    """Number of bytes needed to align size to a multiple of 8"""
+    return -size % 8
+
+
+class MandalaDocument:
+    """A mandala drawing: render parameters plus packed stroke points"""
+
+    def __init__(self, points, offsets, symmetry=8, rotation=0.0, line_width=2.0,
+                 palette_name='Rainbow', palette=None, timestamps=None):
+        self.points = np.asarray(points, dtype=np.float32).reshape(-1, 2)
+        self.offsets = np.asarray(offsets, dtype=np.uint64)
+        self.symmetry = int(symmetry)
+        self.rotation = float(rotation)
+        self.line_width = float(line_width)
+        self.palette_name = palette_name
+        if palette is None:
+            palette = PALETTES[palette_name]
+        self.palette = [tuple(int(c) for c in color) for color in palette]
+
+        if len(self.offsets) == 0 or self.offsets[0] != 0 or self.offsets[-1] != len(self.points):
+            raise ValueError("offsets do not match the number of points")
+
+        # Optional time in seconds at which every point was drawn
+        self.timestamps = None
+        if timestamps is not None:
+            self.timestamps = np.asarray(timestamps, dtype=np.float32).reshape(-1)
+            if len(self.timestamps) != len(self.points):
+                raise ValueError("timestamps do not match the number of points")
+
+    @classmethod
+    def from_strokes(cls, strokes, times=None, **params):
+        """Pack a list of strokes (sequences of (x, y) points) into a document
+
+        times optionally holds one sequence of timestamps per stroke.
+        """
+        arrays = [np.asarray(stroke, dtype=np.float32).reshape(-1, 2) for stroke in strokes]
+        offsets = np.zeros(len(arrays) + 1, dtype=np.uint64)
+        offsets[1:] = np.cumsum([len(a) for a in arrays], dtype=np.uint64)
+        points = np.concatenate(arrays) if arrays else np.empty((0, 2), dtype=np.float32)
+        timestamps = None
+        if times is not None:
+            timestamps = np.concatenate([np.asarray(t, dtype=np.float32).reshape(-1) for t in times]
+                                        + [np.empty(0, dtype=np.float32)])
+        return cls(points, offsets, timestamps=timestamps, **params)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def stroke(self, index):
+        """Return the points of one stroke as a (n, 2) array view"""
+        return self.points[int(self.offsets[index]):int(self.offsets[index + 1])]
+
+    def strokes(self):
+        """Return all strokes as a list of array views"""
+        return np.split(self.points, self.offsets[1:-1].astype(np.intp))
+
+    def stroke_times(self):
+        """Return the timestamps of all strokes as a list of array views, or None"""
+        if self.timestamps is None:
+            return None
+        return np.split(self.timestamps, self.offsets[1:-1].astype(np.intp))
+
+    def stroke_colors(self):
+        """Return the RGB color of every stroke, cycling through the palette"""
+        return [self.palette[i % len(self.palette)] for i in range(len(self))]
+
+    def to_bytes(self):
+        """Serialise the document"""
+        name = self.palette_name.encode('utf-8')
+        flags = FLAG_TIMESTAMPS if self.timestamps is not None else 0
+        header = HEADER.pack(MAGIC, VERSION, flags, self.symmetry, self.rotation,
+                             self.line_width, len(self), len(self.points),
+                             len(name), len(self.palette))
+        colors = bytes(c for color in self.palette for c in color)
+        head = header + name + colors
+        parts = [
+            head,
+            b'\0' * _padding(len(head)),
+            self.offsets.astype('<u8').tobytes(),
+            self.points.astype('<f4').tobytes(),
+        ]
+        if self.timestamps is not None:
+            parts.append(self.timestamps.astype('<f4').tobytes())
+        return b''.join(parts)
+
+    def save(self, filename):
+        """Write the document to a file
+
+        The data goes to a temporary file that then replaces filename, so
+        documents still memory-mapping the old file keep seeing its contents.
+        """
+        data = self.to_bytes()
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(filename)), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            # mkstemp creates files readable only by the owner
+            os.chmod(tmp_path, os.stat(filename).st_mode if os.path.exists(filename) else 0o644)
+            os.replace(tmp_path, filename)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def from_buffer(cls, buffer):
+        """Create a document backed by a bytes-like object without copying points"""
+        (magic, version, flags, symmetry, rotation, line_width,
+         n_strokes, n_points, name_len, n_colors) = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError("not a mandala document")
+        if version > VERSION:
+            raise ValueError(f"unsupported mandala document version {version}")
+
+        pos = HEADER.size
+        palette_name = bytes(buffer[pos:pos + name_len]).decode('utf-8')
+        pos += name_len
+        colors = bytes(buffer[pos:pos + 3 * n_colors])
+        palette = [tuple(colors[i:i + 3]) for i in range(0, len(colors), 3)]
+        pos += 3 * n_colors
+        pos += _padding(pos)
+
+        offsets = np.frombuffer(buffer, dtype='<u8', count=n_strokes + 1, offset=pos)
+        pos += offsets.nbytes
+        points = np.frombuffer(buffer, dtype='<f4', count=2 * n_points, offset=pos)
+        pos += points.nbytes
+        timestamps = None
+        if flags & FLAG_TIMESTAMPS:
+            timestamps = np.frombuffer(buffer, dtype='<f4', count=n_points, offset=pos)
+
+        return cls(points.reshape(-1, 2), offsets, symmetry=symmetry, rotation=rotation,
+                   line_width=line_width, palette_name=palette_name, palette=palette,
+                   timestamps=timestamps)
+
+    @classmethod
+    def load(cls, filename, use_mmap=True):
+        """Load a document, memory-mapping the file unless use_mmap is False
+
+        The arrays of a memory-mapped document are read-only views of the
+        file, which stays mapped as long as they are referenced.
+        """
+        with open(filename, 'rb') as f:
+            if use_mmap:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                buffer = f.read()
+        return cls.from_buffer(buffer)
@@ -0,0 +1,149 @@
+"""Tiled export of mandala documents at print resolution.
+
+A 16384 x 16384 image is 1 GB as RGBA and several times that while it is
+supersampled, so large exports are split into square tiles. Every tile only
+draws the stroke copies whose bounding box overlaps it, tiles are rendered
+by a pool of worker processes with the NumPy rasterizer, and each worker
+writes its tile straight into a memory-mapped raw image next to the output
+file. The PNG is then compressed from the memory map a few rows at a time,
+so peak memory depends on the tile size and the number of workers, not on
+the size of the image:
+
+    python mandala_export.py drawing.mandala -o print.png --size 16384 --jobs 8
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from mandala_document import MandalaDocument, EXTENSION, hex_to_rgb
+from mandala_render import BACKGROUND, scaled_line_width
+from mandala_raster import (SUPERSAMPLE, rasterize_region, stroke_bounds, write_png,
+                            document_with_line_width)
+
+# Tile width and height in output pixels; a worker needs about
+# 3 * (TILE_SIZE * supersample)**2 bytes for the supersampled tile
+TILE_SIZE = 1024
+
+
+def tile_regions(size, tile_size=TILE_SIZE):
+    """Split a size x size image into (x0, y0, x1, y1) tiles, row by row"""
+    return [(x, y, min(x + tile_size, size), min(y + tile_size, size))
+            for y in range(0, size, tile_size) for x in range(0, size, tile_size)]
+
+
+def cull_strokes(positions, boxes, region, margin):
+    """Return the stroke copies whose bounding box, grown by margin, overlaps region"""
+    x0, y0, x1, y1 = region
+    overlaps = ((boxes[:, 0] - margin < x1) & (boxes[:, 2] + margin >= x0) &
+                (boxes[:, 1] - margin < y1) & (boxes[:, 3] + margin >= y0))
+    return positions[overlaps]
+
+
+def render_tile(document_path, image_path, size, region, positions, options):
+    """Render one tile into the memory-mapped image; runs in a worker process"""
+    document = MandalaDocument.load(document_path)
+    tile = rasterize_region(document, size, region, positions, **options)
+    image = np.memmap(image_path, dtype=np.uint8, mode='r+', shape=(size, size, 4))
+    x0, y0, x1, y1 = region
+    image[y0:y1, x0:x1] = tile
+    image.flush()
+    del image
+    return region
+
+
+def export_tiled(document, filename, size, tile_size=TILE_SIZE, jobs=None, palette=None,
+                 line_width=None, background=BACKGROUND, supersample=SUPERSAMPLE, progress=None):
+    """Render a document (or the path of a document file) to a size x size PNG file
+
+    jobs is the number of worker processes (default: one per CPU).
+    progress, if given, is called with the number of finished and total tiles.
+    """
+    directory = os.path.dirname(os.path.abspath(filename))
+    temporary = []
+    try:
+        # Workers load the document themselves instead of receiving a pickled copy
+        if isinstance(document, MandalaDocument):
+            fd, document_path = tempfile.mkstemp(suffix=EXTENSION, dir=directory)
+            os.close(fd)
+            temporary.append(document_path)
+            document.save(document_path)
+        else:
+            document_path = document
+            document = MandalaDocument.load(document_path)
+
+        # Culling margin: half the line width plus a pixel for antialiasing
+        width = scaled_line_width(document_with_line_width(document, line_width)
+                                  if line_width is not None else document, size)
+        margin = width / 2 + 1
+        positions, boxes = stroke_bounds(document, size)
+
+        fd, image_path = tempfile.mkstemp(suffix='.rgba', dir=directory)
+        os.close(fd)
+        temporary.append(image_path)
+        image = np.memmap(image_path, dtype=np.uint8, mode='w+', shape=(size, size, 4))
+
+        options = {'palette': palette, 'line_width': line_width,
+                   'background': background, 'supersample': supersample}
+        regions = tile_regions(size, tile_size)
+        tiles = []
+        fill = np.array([*hex_to_rgb(background), 255], dtype=np.uint8)
+        for region in regions:
+            selected = cull_strokes(positions, boxes, region, margin)
+            if len(selected):
+                tiles.append((region, selected))
+            else:
+                # Nothing to draw, the tile is plain background
+                x0, y0, x1, y1 = region
+                image[y0:y1, x0:x1] = fill
+        image.flush()
+
+        done = len(regions) - len(tiles)
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(render_tile, document_path, image_path, size, region, selected, options)
+                       for region, selected in tiles]
+            for future in futures:
+                future.result()
+                done += 1
+                if progress:
+                    progress(done, len(regions))
+
+        write_png(filename, image)
+        del image
+    finally:
+        for path in temporary:
+            if os.path.exists(path):
+                os.remove(path)
+    return filename
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export a mandala document as a large PNG, tile by tile.")
+    parser.add_argument('path', help="mandala document file")
+    parser.add_argument('-o', '--output', help="PNG file (default: the document name with .png)")
+    parser.add_argument('--size', type=int, default=16384, help="image width and height in pixels")
+    parser.add_argument('--tile', type=int, default=TILE_SIZE, help="tile width and height in pixels")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument('--supersample', type=int, default=SUPERSAMPLE, help="samples per pixel along each axis")
+    args = parser.parse_args(argv)
+    if args.size < 1 or args.tile < 1:
+        parser.error("size and tile must be positive")
+
+    output = args.output or os.path.splitext(os.path.basename(args.path))[0] + '.png'
+
+    def report(done, total):
+        print(f"\rRendered {done}/{total} tiles", end='', file=sys.stderr, flush=True)
+
+    export_tiled(args.path, output, args.size, args.tile, args.jobs,
+                 supersample=args.supersample, progress=report)
+    print(file=sys.stderr)
+    print(f"Wrote {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""Geometry helpers shared by the mandala tools.
+
+All functions work in document coordinates (see ``mandala_document``):
+rotation is in degrees counter-clockwise and points are (x, y) pairs.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+
+def rotation_angles(symmetry, rotation):
+    """Return the angle in radians of every symmetry axis"""
+    return np.radians(rotation) + np.arange(symmetry) * (2*np.pi/symmetry)
+
+
+def rotation_matrices(symmetry, rotation):
+    """Return one 2x2 rotation matrix per symmetry axis, shape (symmetry, 2, 2)"""
+    angles = rotation_angles(symmetry, rotation)
+    cos_a = np.cos(angles)
+    sin_a = np.sin(angles)
+    return np.stack([
+        np.stack([cos_a, -sin_a], axis=-1),
+        np.stack([sin_a, cos_a], axis=-1)
+    ], axis=1)
+
+
+def symmetric_copies(points, symmetry, rotation):
+    """Rotate points into every symmetric position, shape (symmetry, n, 2)"""
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    return np.einsum('nj,sij->sni', points, rotation_matrices(symmetry, rotation))
+
+
+@lru_cache(maxsize=128)
+def guide_geometry(symmetry, rotation, resolution=100):
+    """Return the unit guide circle and the symmetry axis lines
+
+    The circle is a (resolution, 2) polyline and the axes are a
+    (symmetry, 2, 2) array of lines from the center to the circle. Results
+    are memoized per (symmetry, rotation) and returned read-only.
+    """
+    theta = np.linspace(0, 2*np.pi, resolution)
+    circle = np.column_stack([np.cos(theta), np.sin(theta)])
+
+    angles = rotation_angles(symmetry, rotation)
+    axes = np.zeros((symmetry, 2, 2))
+    axes[:, 1, 0] = np.cos(angles)
+    axes[:, 1, 1] = np.sin(angles)
+
+    circle.setflags(write=False)
+    axes.setflags(write=False)
+    return circle, axes
+
+
+def decimate(points, step):
+    """Keep every step-th point of a polyline, always including the last point"""
+    points = np.asarray(points)
+    if step <= 1 or len(points) <= 2:
+        return points
+    kept = points[::step]
+    if (len(points) - 1) % step:
+        kept = np.concatenate([kept, points[-1:]])
+    return kept
@@ -0,0 +1,141 @@
+"""Undo/redo support for the mandala creators.
+
+Every change to a drawing is recorded as an ``Operation`` in an
+``OperationLog``. Undoing a stroke should not replay the whole history, so
+the creators also keep a ``SnapshotCache``: every ``interval`` strokes they
+store a snapshot of the rendered strokes so far (a raster surface in the
+pygame creator, the rotated line geometry in the matplotlib creator). To
+show the first n strokes they restore the latest snapshot at or below n and
+draw only the remaining strokes on top.
+"""
+
+from collections import namedtuple
+
+# Operation kinds; strokes are stored as (points, times) pairs
+STROKE = 'stroke'
+SYMMETRY = 'symmetry'
+ROTATION = 'rotation'
+LINE_WIDTH = 'line_width'
+PALETTE = 'palette'
+RESET = 'reset'
+# Strokes cleared by the eraser; before holds (index, points, times) triples, the
+# strokes stay in place as empty placeholders so the others keep their colors
+ERASE = 'erase'
+
+# Settings changes that are merged when recorded back to back while a slider is
+# dragged; the creators end the group when the mouse button is released
+MERGEABLE = {SYMMETRY, ROTATION, LINE_WIDTH}
+
+Operation = namedtuple('Operation', ['kind', 'before', 'after'])
+
+
+class OperationLog:
+    """Ordered list of operations with an undo position"""
+
+    def __init__(self):
+        self.operations = []
+        self.position = 0
+        self.merging = False   # the last operation may absorb changes of the same setting
+
+    def record(self, kind, before, after):
+        """Record a new operation, discarding anything that could be redone"""
+        del self.operations[self.position:]
+
+        # Fold consecutive changes of the same setting within a group into one operation
+        if kind in MERGEABLE:
+            if self.merging and self.operations and self.operations[-1].kind == kind:
+                before = self.operations.pop().before
+                self.position = len(self.operations)
+            self.merging = True
+            if before == after:
+                return None
+        else:
+            self.merging = False
+
+        operation = Operation(kind, before, after)
+        self.operations.append(operation)
+        self.position = len(self.operations)
+        return operation
+
+    def end_group(self):
+        """Stop merging, so the next settings change becomes its own operation"""
+        self.merging = False
+
+    def can_undo(self):
+        return self.position > 0
+
+    def can_redo(self):
+        return self.position < len(self.operations)
+
+    def undo(self):
+        """Step back and return the operation to revert, or None"""
+        if not self.can_undo():
+            return None
+        self.merging = False
+        self.position -= 1
+        return self.operations[self.position]
+
+    def redo(self):
+        """Step forward and return the operation to apply again, or None"""
+        if not self.can_redo():
+            return None
+        self.merging = False
+        operation = self.operations[self.position]
+        self.position += 1
+        return operation
+
+    def clear(self):
+        self.operations = []
+        self.position = 0
+        self.merging = False
+
+
+class SnapshotCache:
+    """Snapshots of the first n strokes, taken every `interval` strokes
+
+    A snapshot is only valid for the render settings it was made with
+    (symmetry, rotation, line width, palette), passed in as `key`.
+    """
+
+    def __init__(self, interval=50, limit=20):
+        self.interval = interval
+        self.limit = limit
+        self.key = None
+        self.snapshots = {}
+
+    def due(self, stroke_count):
+        """Whether a snapshot should be taken after drawing stroke_count strokes"""
+        return stroke_count > 0 and stroke_count % self.interval == 0
+
+    def store(self, stroke_count, key, snapshot):
+        """Store the snapshot of the first stroke_count strokes"""
+        if key != self.key:
+            self.clear()
+            self.key = key
+        self.snapshots[stroke_count] = snapshot
+
+        # Thin out old snapshots, keeping the most recent ones
+        while len(self.snapshots) > self.limit:
+            del self.snapshots[min(self.snapshots)]
+
+    def latest(self, stroke_count, key):
+        """Return (count, snapshot) of the latest snapshot at or below stroke_count
+
+        Returns (0, None) when there is no usable snapshot.
+        """
+        if key != self.key:
+            return 0, None
+        counts = [count for count in self.snapshots if count <= stroke_count]
+        if not counts:
+            return 0, None
+        count = max(counts)
+        return count, self.snapshots[count]
+
+    def discard_after(self, stroke_count):
+        """Drop snapshots that include strokes beyond stroke_count"""
+        for count in [count for count in self.snapshots if count > stroke_count]:
+            del self.snapshots[count]
+
+    def clear(self):
+        self.key = None
+        self.snapshots = {}
@@ -0,0 +1,142 @@
+"""Spatial index over the rotated copies of mandala strokes.
+
+Finding the strokes under the eraser, or the segments crossing a damaged
+rectangle, would otherwise mean scanning every rotated copy of every stroke.
+StrokeIndex sorts the segments of all copies into a uniform grid of square
+cells. Strokes are added one by one as they are committed; a change of
+symmetry or rotation moves every copy, so the grid is then rebuilt from
+scratch (see update).
+
+The index works in the coordinates of the creator using it (canvas pixels
+or document units); cell sizes and query radii are given in the same units.
+"""
+
+import numpy as np
+
+from mandala_geometry import symmetric_copies
+
+
+def point_segment_distance(point, starts, ends):
+    """Distance from a point to each of the segments starts[i] -> ends[i]"""
+    direction = ends - starts
+    length_sq = np.einsum('ij,ij->i', direction, direction)
+    offset = np.asarray(point, dtype=np.float64) - starts
+    with np.errstate(invalid='ignore', divide='ignore'):
+        t = np.einsum('ij,ij->i', offset, direction) / length_sq
+    # Zero length segments are points
+    t = np.clip(np.nan_to_num(t), 0, 1)
+    return np.hypot(*(offset - t[:, None] * direction).T)
+
+
+class StrokeIndex:
+    """Uniform grid of the segments of all symmetric copies of the strokes
+
+    Segments are numbered in drawing order: stroke by stroke, and within a
+    stroke copy by copy. Removing a stroke only marks its segments as dead,
+    they are dropped when the grid is rebuilt.
+    """
+
+    def __init__(self, cell_size, symmetry=1, rotation=0):
+        self.cell_size = cell_size
+        self.clear(symmetry, rotation)
+
+    def clear(self, symmetry=None, rotation=None):
+        """Remove all strokes, optionally switching to other symmetry settings"""
+        if symmetry is not None:
+            self.symmetry = symmetry
+        if rotation is not None:
+            self.rotation = rotation
+        self.cells = {}      # (column, row) -> list of segment number arrays
+        self.starts = np.empty((0, 2))
+        self.ends = np.empty((0, 2))
+        self.owner = np.empty(0, dtype=np.intp)
+        self.alive = np.empty(0, dtype=bool)
+        self.size = 0        # segments in use; the arrays above grow by doubling
+        self.bounds = {}     # stroke -> (symmetry, 4) array of copy bounding boxes
+        self.count = 0       # number of strokes covered, including empty ones
+
+    def update(self, strokes, symmetry, rotation):
+        """Bring the index up to date with the list of strokes
+
+        Strokes appended since the last update are added. If the settings
+        changed or strokes were removed from the end, the grid is rebuilt.
+        """
+        if (symmetry, rotation) != (self.symmetry, self.rotation) or len(strokes) < self.count:
+            self.clear(symmetry, rotation)
+        for index in range(self.count, len(strokes)):
+            self.add(index, strokes[index])
+
+    def add(self, stroke, points):
+        """Add all copies of a stroke; strokes with fewer than two points are skipped"""
+        self.count = max(self.count, stroke + 1)
+        if len(points) < 2:
+            return
+
+        copies = symmetric_copies(points, self.symmetry, self.rotation)
+        starts = copies[:, :-1].reshape(-1, 2)
+        ends = copies[:, 1:].reshape(-1, 2)
+        first = self.size
+        self.reserve(first + len(starts))
+        self.starts[first:first + len(starts)] = starts
+        self.ends[first:first + len(starts)] = ends
+        self.owner[first:first + len(starts)] = stroke
+        self.alive[first:first + len(starts)] = True
+        self.size += len(starts)
+        self.bounds[stroke] = np.hstack([copies.min(axis=1), copies.max(axis=1)])
+
+        # Every segment goes into all cells overlapped by its bounding box
+        low = np.floor(np.minimum(starts, ends) / self.cell_size).astype(np.int64)
+        spans = np.floor(np.maximum(starts, ends) / self.cell_size).astype(np.int64) - low + 1
+        counts = spans[:, 0] * spans[:, 1]
+        segment = np.repeat(np.arange(len(starts)), counts)
+        k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        cells = low[segment] + np.column_stack([k % spans[segment, 0], k // spans[segment, 0]])
+
+        keys, inverse = np.unique(cells, axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        members = np.split((segment + first)[np.argsort(inverse, kind='stable')],
+                           np.cumsum(np.bincount(inverse))[:-1])
+        for key, numbers in zip(map(tuple, keys.tolist()), members):
+            self.cells.setdefault(key, []).append(numbers)
+
+    def remove(self, stroke):
+        """Remove all copies of a stroke"""
+        if self.bounds.pop(stroke, None) is not None:
+            self.alive[:self.size][self.owner[:self.size] == stroke] = False
+
+    def reserve(self, size):
+        """Grow the segment arrays to hold at least size segments"""
+        if size <= len(self.owner):
+            return
+        capacity = max(size, 2 * len(self.owner), 1024)
+        for name in ('starts', 'ends', 'owner', 'alive'):
+            old = getattr(self, name)
+            new = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def segments_in_rect(self, x0, y0, x1, y1):
+        """Return the live segments in the cells overlapping a rectangle, in drawing order"""
+        c0, r0 = int(np.floor(x0 / self.cell_size)), int(np.floor(y0 / self.cell_size))
+        c1, r1 = int(np.floor(x1 / self.cell_size)), int(np.floor(y1 / self.cell_size))
+        found = [numbers
+                 for column in range(c0, c1 + 1)
+                 for row in range(r0, r1 + 1)
+                 for numbers in self.cells.get((column, row), ())]
+        if not found:
+            return np.empty(0, dtype=np.intp)
+        numbers = np.unique(np.concatenate(found))
+        numbers = numbers[self.alive[numbers]]
+        # Strokes that were removed and added again have later numbers
+        return numbers[np.argsort(self.owner[numbers], kind='stable')]
+
+    def query(self, point, radius):
+        """Return the sorted strokes that have a copy within radius of point"""
+        x, y = point
+        numbers = self.segments_in_rect(x - radius, y - radius, x + radius, y + radius)
+        distance = point_segment_distance(point, self.starts[numbers], self.ends[numbers])
+        return np.unique(self.owner[numbers[distance <= radius]]).tolist()
+
+    def copy_bounds(self, stroke):
+        """Return the (x0, y0, x1, y1) bounding box of every copy of a stroke"""
+        return self.bounds.get(stroke, np.empty((0, 4)))
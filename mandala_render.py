@@ -0,0 +1,159 @@
+"""Headless rendering of mandala documents.
+
+Renders a document at any resolution with matplotlib's Agg backend without
+creating a window, so exports do not touch the interactive session. The
+command line renders whole directories of documents in parallel:
+
+    python mandala_render.py drawings/ -o exports/ --size 7680 --jobs 8
+
+With --engine numpy documents are drawn by the pure NumPy rasterizer in
+mandala_raster instead, which needs no plotting library.
+"""
+
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from mandala_document import MandalaDocument, REFERENCE_SIZE, EXTENSION, rgb_to_hex
+from mandala_geometry import symmetric_copies
+
+# Visible area around the guide circle, matching the interactive creators
+VIEW_LIMIT = 1.2
+BACKGROUND = '#222222'
+GUIDE_COLOR = '#444444'
+DPI = 100
+
+
+def scaled_line_width(document, size):
+    """Line width in pixels for an output image of the given size"""
+    circle_diameter = size / VIEW_LIMIT
+    return document.line_width * circle_diameter / REFERENCE_SIZE
+
+
+def document_segments(document):
+    """Return every rotated copy of every stroke with its color index
+
+    Copies are returned stroke by stroke, all copies of a stroke before the
+    next stroke, which is the order the creators draw them in.
+    """
+    copies = symmetric_copies(document.points, document.symmetry, document.rotation)
+    offsets = document.offsets.astype(np.intp)
+    segments = []
+    color_indices = []
+    for index in range(len(document)):
+        start, end = offsets[index], offsets[index + 1]
+        if end - start > 1:
+            segments.extend(copies[:, start:end])
+            color_indices.extend([index % len(document.palette)] * len(copies))
+    return segments, color_indices
+
+
+def create_figure(document, size, background=BACKGROUND, guide=False):
+    """Create an off-screen figure showing the document"""
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.collections import LineCollection
+
+    fig = Figure(figsize=(size / DPI, size / DPI), dpi=DPI)
+    FigureCanvasAgg(fig)
+    fig.patch.set_facecolor(background)
+    ax = fig.add_axes([0, 0, 1, 1])
+    ax.set_facecolor(background)
+    ax.set_aspect('equal')
+    ax.set_xlim(-VIEW_LIMIT, VIEW_LIMIT)
+    ax.set_ylim(-VIEW_LIMIT, VIEW_LIMIT)
+    ax.axis('off')
+
+    if guide:
+        theta = np.linspace(0, 2*np.pi, 100)
+        ax.plot(np.cos(theta), np.sin(theta), color=GUIDE_COLOR, linestyle='--', alpha=0.5)
+
+    # All rotated copies go into one collection so matplotlib draws them in a single pass
+    segments, color_indices = document_segments(document)
+    palette = [rgb_to_hex(color) for color in document.palette]
+    line_width = scaled_line_width(document, size) * 72 / DPI
+    lines = LineCollection(segments, linewidths=line_width,
+                           colors=[palette[i] for i in color_indices],
+                           alpha=0.8, zorder=2)
+    ax.add_collection(lines)
+    return fig
+
+
+def render_document(document, size=2048, background=BACKGROUND, guide=False):
+    """Render a document to an RGBA array of shape (size, size, 4)"""
+    fig = create_figure(document, size, background, guide)
+    fig.canvas.draw()
+    return np.asarray(fig.canvas.buffer_rgba()).copy()
+
+
+def save_document_image(document, filename, size=2048, background=BACKGROUND, guide=False):
+    """Render a document and write it to an image file"""
+    fig = create_figure(document, size, background, guide)
+    fig.savefig(filename, dpi=DPI, facecolor=background)
+
+
+def render_file(path, output_dir, size, guide=False, engine='matplotlib'):
+    """Render one document file into output_dir and return the image path"""
+    document = MandalaDocument.load(path)
+    name = os.path.splitext(os.path.basename(path))[0] + '.png'
+    filename = os.path.join(output_dir, name)
+    if engine == 'numpy':
+        from mandala_raster import save_document_raster
+        save_document_raster(document, filename, size=size)
+    else:
+        save_document_image(document, filename, size=size, guide=guide)
+    return filename
+
+
+def find_documents(paths):
+    """Expand directories into the mandala documents they contain"""
+    documents = []
+    for path in paths:
+        if os.path.isdir(path):
+            documents.extend(sorted(
+                os.path.join(path, name) for name in os.listdir(path)
+                if name.endswith(EXTENSION)
+            ))
+        else:
+            documents.append(path)
+    return documents
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render mandala documents without a window.")
+    parser.add_argument('paths', nargs='+', help="document files or directories of documents")
+    parser.add_argument('-o', '--output', default='.', help="output directory (default: current)")
+    parser.add_argument('--size', type=int, default=2048, help="image width and height in pixels")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument('--guide', action='store_true', help="draw the guide circle")
+    parser.add_argument('--engine', choices=('matplotlib', 'numpy'), default='matplotlib',
+                        help="renderer; numpy needs no plotting library (see mandala_raster)")
+    args = parser.parse_args(argv)
+    if args.guide and args.engine == 'numpy':
+        parser.error("the guide circle is only drawn by the matplotlib engine")
+
+    documents = find_documents(args.paths)
+    if not documents:
+        print("No mandala documents found.")
+        return 1
+    os.makedirs(args.output, exist_ok=True)
+
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        futures = [pool.submit(render_file, path, args.output, args.size,
+                               args.guide, args.engine)
+                   for path in documents]
+        failures = 0
+        for path, future in zip(documents, futures):
+            try:
+                print(f"Rendered {path} -> {future.result()}")
+            except Exception as e:
+                failures += 1
+                print(f"Failed to render {path}: {e}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+"""Time-lapse replays of recorded mandala drawings.
+
+The creators store when every point was drawn in the saved document (see
+mandala_document). A replay turns those timestamps into video frames: each
+finished stroke is drawn once onto a persistent supersampled canvas by the
+NumPy rasterizer, so a frame only costs the strokes added since the
+previous one plus the stroke still being drawn. Raw frames are piped to an
+ffmpeg process one at a time, so memory use does not grow with the length
+of the session:
+
+    python mandala_replay.py drawing.mandala -o drawing.mp4 --size 1080 --speed 4
+
+Long pauses between strokes are shortened, and documents saved without
+timestamps are replayed at a constant drawing speed.
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+
+import numpy as np
+
+from mandala_document import MandalaDocument
+from mandala_render import BACKGROUND, scaled_line_width
+from mandala_raster import (palette_colors, document_segments, background_planes, blend_tables,
+                            draw_segments, downsample)
+
+FPS = 30
+
+# Video seconds per second of drawing time
+SPEED = 1.0
+
+# Pauses in the drawing longer than this many seconds are shortened to it
+MAX_PAUSE = 0.5
+
+# Seconds the finished drawing stays on screen at the end
+HOLD = 2.0
+
+# Frames are smaller than exports, so a lower supersampling is enough
+SUPERSAMPLE = 2
+
+# Drawing speed assumed for documents without timestamps
+POINTS_PER_SECOND = 120
+STROKE_PAUSE = 0.3
+
+# x264 quality, lower is better
+CRF = 18
+
+
+def synthetic_timestamps(document, points_per_second=POINTS_PER_SECOND, stroke_pause=STROKE_PAUSE):
+    """Timestamps of the document drawn at a constant speed, stroke after stroke"""
+    index = np.arange(len(document.points))
+    stroke = np.searchsorted(document.offsets[1:].astype(np.intp), index, side='right')
+    return index / points_per_second + stroke * stroke_pause
+
+
+def replay_times(timestamps, speed=SPEED, max_pause=MAX_PAUSE):
+    """Map point timestamps to seconds of video, shortening pauses to max_pause"""
+    times = np.maximum.accumulate(np.asarray(timestamps, dtype=np.float64))
+    steps = np.minimum(np.diff(times, prepend=times[:1]), max_pause)
+    return np.cumsum(steps) / speed
+
+
+def replay_frames(document, size, fps=FPS, speed=SPEED, max_pause=MAX_PAUSE, hold=HOLD,
+                  supersample=SUPERSAMPLE, background=BACKGROUND):
+    """Yield the frames of a replay as (size, size, 3) uint8 arrays
+
+    Strokes are drawn in the order they were recorded, with all their
+    symmetric copies at once. Frames without new points repeat the previous
+    frame without drawing anything.
+    """
+    timestamps = document.timestamps
+    if timestamps is None:
+        timestamps = synthetic_timestamps(document)
+    video_times = replay_times(timestamps, speed, max_pause)
+
+    strokes = len(document)
+    offsets = document.offsets.astype(np.intp)
+    scaled = size * supersample
+    radius = max(0.5, scaled_line_width(document, scaled) / 2)
+    tables = blend_tables(palette_colors(document.palette))
+    copies = np.arange(document.symmetry)
+    canvas = background_planes(background, scaled, scaled)
+
+    def draw(planes, stroke, limit=None):
+        starts, ends, position = document_segments(document, scaled, stroke * document.symmetry + copies,
+                                                   limit=limit)
+        draw_segments(planes, scaled, scaled, starts, ends, position, document.symmetry, tables, radius)
+
+    duration = video_times[-1] if len(video_times) else 0.0
+    count = int(np.ceil(duration * fps)) + 1 + int(round(hold * fps))
+    finished = 0   # strokes drawn onto the canvas
+    shown = None   # points visible in the previous frame
+    for number in range(count):
+        visible = int(np.searchsorted(video_times, number / fps, side='right'))
+        if visible != shown:
+            # Strokes finished since the previous frame are drawn onto the canvas for good
+            while finished < strokes and offsets[finished + 1] <= visible:
+                draw(canvas, finished)
+                finished += 1
+
+            # The stroke in progress is drawn onto a copy, it grows in later frames
+            planes = canvas
+            if finished < strokes and visible - offsets[finished] > 1:
+                planes = canvas.copy()
+                draw(planes, finished, visible)
+            frame = downsample(planes, size, size, supersample)[..., :3]
+            shown = visible
+        yield frame
+
+
+def encoder_command(filename, size, fps=FPS, crf=CRF, ffmpeg='ffmpeg'):
+    """ffmpeg command line that encodes raw RGB frames read from stdin"""
+    return [ffmpeg, '-y', '-loglevel', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f'{size}x{size}', '-r', str(fps), '-i', '-',
+            '-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-crf', str(crf), filename]
+
+
+def export_video(document, filename, size=1080, fps=FPS, command=None, progress=None, **options):
+    """Replay a document into a video file through an encoder subprocess
+
+    command defaults to encoder_command(filename, size, fps); it must read raw
+    rgb24 frames from stdin. Other options are passed on to replay_frames.
+    progress, if given, is called with the number of frames written so far.
+    """
+    if command is None:
+        command = encoder_command(filename, size, fps)
+    process = subprocess.Popen(command, stdin=subprocess.PIPE)
+    try:
+        for number, frame in enumerate(replay_frames(document, size, fps, **options), 1):
+            process.stdin.write(frame.tobytes())
+            if progress:
+                progress(number)
+    except BrokenPipeError:
+        pass  # the encoder failed, its exit status is reported below
+    finally:
+        try:
+            process.stdin.close()
+        except BrokenPipeError:
+            pass
+        status = process.wait()
+    if status:
+        raise RuntimeError(f"encoder exited with status {status}")
+    return filename
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render a time-lapse video of a mandala document.")
+    parser.add_argument('path', help="mandala document file")
+    parser.add_argument('-o', '--output', help="video file (default: the document name with .mp4)")
+    parser.add_argument('--size', type=int, default=1080, help="video width and height in pixels (even)")
+    parser.add_argument('--fps', type=int, default=FPS, help="frames per second")
+    parser.add_argument('--speed', type=float, default=SPEED, help="video seconds per second of drawing")
+    parser.add_argument('--max-pause', type=float, default=MAX_PAUSE,
+                        help="longest pause between points in seconds of drawing")
+    parser.add_argument('--hold', type=float, default=HOLD, help="seconds to show the finished drawing")
+    parser.add_argument('--supersample', type=int, default=SUPERSAMPLE, help="samples per pixel along each axis")
+    parser.add_argument('--ffmpeg', default='ffmpeg', help="ffmpeg executable")
+    args = parser.parse_args(argv)
+    if args.size < 2 or args.size % 2:
+        parser.error("the size must be even for yuv420p video")
+    if shutil.which(args.ffmpeg) is None:
+        parser.error(f"{args.ffmpeg} was not found; install ffmpeg or pass --ffmpeg")
+
+    document = MandalaDocument.load(args.path)
+    if document.timestamps is None:
+        print("The document has no timestamps, replaying at a constant speed", file=sys.stderr)
+    output = args.output or os.path.splitext(os.path.basename(args.path))[0] + '.mp4'
+
+    def report(frames):
+        if frames % args.fps == 0:
+            print(f"\r{frames // args.fps} s of video", end='', file=sys.stderr, flush=True)
+
+    command = encoder_command(output, args.size, args.fps, ffmpeg=args.ffmpeg)
+    export_video(document, output, args.size, args.fps, command, report, speed=args.speed,
+                 max_pause=args.max_pause, hold=args.hold, supersample=args.supersample)
+    print(file=sys.stderr)
+    print(f"Wrote {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())